@@ -0,0 +1,139 @@
+# Seconde passe de détection du ballon : recadrage autour de la position prédite, tuiles quand il est perdu
+import numpy as np
+from inference_pool import to_supervision
+
+
+class BallSearch:
+    """
+    Recherche ciblée du ballon, lancée uniquement sur les frames où la passe principale l'a manqué :
+    - "crop" : petit recadrage autour de la position prédite (vitesse constante), inféré en haute
+      résolution relative (crop_size pixels agrandis à crop_imgsz) ;
+    - "tiles" : découpage de la frame entière en tuiles (style SAHI) quand le ballon est perdu
+      depuis plus de lost_after frames, au plus une fois toutes les tile_interval frames ;
+    - "both" : recadrage d'abord, tuiles en dernier recours.
+    """
+
+    MODES = ("crop", "tiles", "both")
+
+    def __init__(self, mode="crop", crop_size=256, crop_imgsz=640, tile_size=640, tile_overlap=0.2,
+                 tile_interval=5, predict_window=25, lost_after=5):
+        if mode not in self.MODES:
+            raise ValueError(f"Mode de recherche du ballon inconnu : {mode}")
+        self.mode = mode
+        self.use_crop = mode in ("crop", "both")
+        self.use_tiles = mode in ("tiles", "both")
+        self.crop_size = crop_size
+        self.crop_imgsz = crop_imgsz
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.tile_interval = tile_interval
+        self.predict_window = predict_window  # Frames pendant lesquelles la position prédite reste fiable
+        self.lost_after = lost_after
+        self.crops = 0
+        self.crop_hits = 0
+        self.tile_runs = 0
+        self.tile_hits = 0
+        self.reset()
+
+    def reset(self):
+        self._last = None  # (frame_idx, bbox) de la dernière observation
+        self._velocity = np.zeros(4, dtype=np.float32)
+        self._last_tiles = None
+
+    @property
+    def key(self):
+        """
+        Réglages qui influent sur les détections (clé du cache de détections).
+        """
+        return f"{self.mode}:{self.crop_size}:{self.crop_imgsz}:{self.tile_size}:{self.tile_overlap}:{self.tile_interval}"
+
+    def observe(self, frame_idx, bbox):
+        """
+        Met à jour la dernière position connue et la vitesse du ballon.
+        """
+        bbox = np.asarray(bbox, dtype=np.float32)
+        if self._last is not None and 0 < frame_idx - self._last[0] <= self.predict_window:
+            self._velocity = (bbox - self._last[1]) / (frame_idx - self._last[0])
+        else:
+            self._velocity = np.zeros(4, dtype=np.float32)
+        self._last = (frame_idx, bbox.copy())
+
+    def predicted_bbox(self, frame_idx):
+        if self._last is None or frame_idx - self._last[0] > self.predict_window:
+            return None
+        return self._last[1] + self._velocity * (frame_idx - self._last[0])
+
+    def search(self, model, frame, frame_idx, ball_class, conf):
+        """
+        Boîte (4,) du ballon dans les coordonnées de la frame, ou None.
+        """
+        bbox = None
+        if self.use_crop:
+            predicted = self.predicted_bbox(frame_idx)
+            if predicted is not None:
+                bbox = self._search_crop(model, frame, predicted, ball_class, conf)
+
+        lost = self._last is None or frame_idx - self._last[0] > self.lost_after
+        if (bbox is None and self.use_tiles and lost
+                and (self._last_tiles is None or frame_idx - self._last_tiles >= self.tile_interval)):
+            self._last_tiles = frame_idx
+            bbox = self._search_tiles(model, frame, ball_class, conf)
+
+        if bbox is not None:
+            self.observe(frame_idx, bbox)
+        return bbox
+
+    def _search_crop(self, model, frame, predicted, ball_class, conf):
+        height, width = frame.shape[:2]
+        size = min(self.crop_size, width, height)
+        cx, cy = (predicted[0] + predicted[2]) / 2, (predicted[1] + predicted[3]) / 2
+        x0 = int(np.clip(cx - size / 2, 0, width - size))
+        y0 = int(np.clip(cy - size / 2, 0, height - size))
+        self.crops += 1
+        result = model.predict([frame[y0:y0 + size, x0:x0 + size]], conf=conf, imgsz=self.crop_imgsz)[0]
+        bbox = self._best_ball(result, ball_class, (x0, y0))
+        if bbox is not None:
+            self.crop_hits += 1
+        return bbox
+
+    def _search_tiles(self, model, frame, ball_class, conf):
+        height, width = frame.shape[:2]
+        origins = [(x, y) for y in self._tile_starts(height) for x in self._tile_starts(width)]
+        tiles = [frame[y:y + self.tile_size, x:x + self.tile_size] for x, y in origins]
+        self.tile_runs += 1
+        best, best_conf = None, -1.0
+        for result, origin in zip(model.predict(tiles, conf=conf, imgsz=self.tile_size), origins):
+            candidate = self._best_ball(result, ball_class, origin, with_confidence=True)
+            if candidate is not None and candidate[1] > best_conf:
+                best, best_conf = candidate
+        if best is not None:
+            self.tile_hits += 1
+        return best
+
+    def _tile_starts(self, length):
+        if length <= self.tile_size:
+            return [0]
+        step = max(1, int(self.tile_size * (1 - self.tile_overlap)))
+        starts = list(range(0, length - self.tile_size, step))
+        return starts + [length - self.tile_size]
+
+    @staticmethod
+    def _best_ball(result, ball_class, origin, with_confidence=False):
+        detections = to_supervision(result)
+        balls = np.flatnonzero(detections.class_id == ball_class)
+        if not len(balls):
+            return None
+        best = balls[np.argmax(detections.confidence[balls])] if detections.confidence is not None else balls[-1]
+        bbox = detections.xyxy[best].astype(np.float32) + np.array([origin[0], origin[1]] * 2, dtype=np.float32)
+        if with_confidence:
+            return bbox, float(detections.confidence[best]) if detections.confidence is not None else 0.0
+        return bbox
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "crops": self.crops,
+            "crop_hits": self.crop_hits,
+            "tile_runs": self.tile_runs,
+            "tile_hits": self.tile_hits,
+        }
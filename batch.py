@@ -0,0 +1,306 @@
+# Traitement hors ligne d'un dossier de matchs, sans interface web ni diffusion
+#
+# Exemples :
+#   python batch.py matches/ --output results
+#   python batch.py "matches/*.mp4" --annotate --backend openvino --precision int8
+#
+# L'analyse est enregistrée au fil de l'eau dans le cache de détections (partagé avec app.py) :
+# après une interruption, une nouvelle exécution reprend à la dernière frame enregistrée.
+import argparse
+import glob
+import os
+import threading
+import time
+from collections import Counter
+import numpy as np
+import pandas as pd
+from tracker import Tracker
+from model_registry import get_model
+from model_export import exported_model_path, BACKENDS
+from decoder import VideoDecoder
+from detection_cache import DetectionCache
+from exporter import VideoExporter
+from ball_search import BallSearch
+from team_assigner import TeamAssigner
+from possession import PossessionTracker
+from pipeline import ClosableQueue, QueueClosed, LatencyTracker
+from track_store import KINDS
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+
+def list_videos(inputs):
+    """
+    Vidéos désignées par des dossiers, motifs glob ou fichiers (sans doublons, dans l'ordre).
+    """
+    videos = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths = sorted(os.path.join(item, name) for name in os.listdir(item))
+        else:
+            paths = sorted(glob.glob(item)) or [item]
+        videos += [os.path.normpath(path) for path in paths
+                   if path.lower().endswith(VIDEO_EXTENSIONS) and os.path.isfile(path)]
+    return list(dict.fromkeys(videos))
+
+
+def output_names(videos):
+    """
+    Nom de sortie de chaque vidéo : son chemin relatif au dossier parent commun, sans extension
+    (a/match.mp4 et b/match.mp4 -> a/match et b/match ; le nom du fichier seul pour un dossier unique).
+    L'extension est gardée si elle seule distingue deux vidéos (match.mp4 et match.mkv).
+    """
+    if not videos:
+        return {}
+    parent = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in videos])
+    relative = {path: os.path.relpath(os.path.abspath(path), parent) for path in videos}
+    stems = Counter(os.path.splitext(rel)[0] for rel in relative.values())
+    names = {}
+    for path, rel in relative.items():
+        stem = os.path.splitext(rel)[0]
+        names[path] = stem if stems[stem] == 1 else rel
+    return names
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def write_tracks(store, output_base, fmt):
+    """
+    Écrit les suivis (une ligne par objet et par frame) ; l'écriture est atomique.
+    """
+    columns = {
+        "frame": store.frame,
+        "track_id": store.track_id,
+        "kind": store.kind,
+        "x1": store.bbox[:, 0], "y1": store.bbox[:, 1], "x2": store.bbox[:, 2], "y2": store.bbox[:, 3],
+        "flags": store.flags,
+    }
+    path = f"{output_base}.tracks.{fmt}"
+    tmp_path = f"{path}.tmp"
+    if fmt == "parquet":
+        pd.DataFrame(columns).to_parquet(tmp_path, index=False)
+    else:
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, kinds=np.array(KINDS), **columns)
+    os.replace(tmp_path, path)
+    return path
+
+
+class BatchRunner:
+    """
+    Analyse chaque vidéo de bout en bout : décodage dans un thread dédié, suivi par gros lots,
+    écriture incrémentale dans le cache, puis export des suivis et (optionnellement) de la vidéo annotée.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.model_path = exported_model_path(args.model, args.backend, args.precision)
+        self.model = get_model(self.model_path)
+        self.cache = DetectionCache(args.cache_dir, args.cache_max_gb * 1024 ** 3)
+        self.format = args.format if args.format != "auto" else ("parquet" if parquet_available() else "npz")
+        os.makedirs(args.output, exist_ok=True)
+
+    def make_tracker(self):
+        args = self.args
+        return Tracker(model=self.model, conf=args.conf, imgsz=args.imgsz, detect_stride=args.stride,
+                       motion_threshold=args.motion_threshold, batch_size=args.batch_size,
+                       ball_search=BallSearch(args.ball_search) if args.ball_search else None,
+                       team_assigner=TeamAssigner() if args.teams else None,
+                       possession=PossessionTracker())
+
+    def make_decoder(self, video_path):
+        # Lot en cours de suivi + lot en cours de décodage + lots en attente
+        decoder = VideoDecoder(video_path, buffer_count=4 * self.args.batch_size, max_width=self.args.max_width)
+        if not decoder.open():
+            raise IOError(f"Impossible d'ouvrir {video_path}")
+        return decoder
+
+    def process(self, video_path, name=None):
+        name = name or os.path.splitext(os.path.basename(video_path))[0]
+        output_base = os.path.join(self.args.output, name)
+        os.makedirs(os.path.dirname(output_base), exist_ok=True)
+        tracks_path = f"{output_base}.tracks.{self.format}"
+        if os.path.exists(tracks_path) and not self.args.force:
+            print(f"{name} : déjà traité ({tracks_path})")
+            return
+
+        latency = LatencyTracker()
+        start = time.perf_counter()
+        tracker = self.make_tracker()
+        decoder = self.make_decoder(video_path)
+        key, params = self.cache.make_key(
+            video_path, self.args.model, tracker.conf, tracker.imgsz,
+            decode_width=decoder.frame_size[0] if decoder.resized else None,
+            **tracker.cache_settings(),
+            backend=f"{self.args.backend}:{self.args.precision}" if self.args.backend != "pytorch" else None)
+
+        entry, writer = self.cache.open(key, params)
+        try:
+            # Reprise d'une analyse interrompue (entrée partielle) ou résultats déjà complets
+            resumed = entry.frames_done if entry is not None and writer is not None else 0
+            analysed = 0
+            if writer is not None:
+                analysed = self._analyse(tracker, decoder, writer, resumed, latency)
+                entry = writer.entry()
+            else:
+                decoder.close()
+            if entry is None or not entry.complete:
+                raise RuntimeError(f"Analyse de {name} inachevée (cache en cours d'écriture par un autre job ?)")
+
+            with latency.measure("write_tracks"):
+                store = entry.store(0, entry.frames_done)
+                write_tracks(store, output_base, self.format)
+            if self.args.annotate:
+                self._annotate(tracker, video_path, entry, f"{output_base}_annotated.mp4", latency)
+        finally:
+            self.cache.release(key, writer=writer is not None)
+
+        self._summary(name, entry.frames_done, analysed, resumed, time.perf_counter() - start, latency)
+
+    def _decode_batches(self, decoder, frame_queue, latency):
+        batch_size = self.args.batch_size
+        batch, batch_start = [], decoder.position
+        try:
+            while True:
+                with latency.measure("decode"):
+                    decoded = decoder.read()
+                if decoded is None:
+                    break
+                batch.append(decoded[1])
+                if len(batch) >= batch_size:
+                    frame_queue.put((batch_start, batch))
+                    batch_start += len(batch)
+                    batch = []
+            if batch:
+                frame_queue.put((batch_start, batch))
+            frame_queue.close()
+        except QueueClosed:
+            pass
+        finally:
+            decoder.close()
+
+    def _batches(self, decoder, latency):
+        """
+        Lots (index de début, frames) décodés en parallèle du traitement.
+        """
+        frame_queue = ClosableQueue(maxsize=2)
+        reader = threading.Thread(target=self._decode_batches, args=(decoder, frame_queue, latency), daemon=True)
+        reader.start()
+        try:
+            while True:
+                try:
+                    yield frame_queue.get()
+                except QueueClosed:
+                    break
+        finally:
+            frame_queue.cancel()
+            decoder.interrupt()  # Le décodage peut attendre un buffer que l'appelant ne rendra plus
+            reader.join()
+
+    def _analyse(self, tracker, decoder, writer, resumed, latency):
+        if resumed:
+            decoder.seek(frame=resumed)
+            tracker.frame_count = resumed
+            tracker.track_id_offset = writer.entry().max_track_id  # Pas de collision avec les tracks en cache
+            print(f"Reprise de {os.path.basename(decoder.video_path)} à la frame {resumed}")
+        analysed = 0
+        complete = False
+        try:
+            for batch_start, batch in self._batches(decoder, latency):
+                with latency.measure("tracking"):
+                    store = tracker.update_store(batch)
+                with latency.measure("cache"):
+                    writer.append(store, batch_start, batch_start + len(batch))
+                for frame in batch:
+                    decoder.release(frame)
+                analysed += len(batch)
+            complete = True
+        finally:
+            writer.close(complete=complete, release=False)
+        return analysed
+
+    def _annotate(self, tracker, video_path, entry, output_path, latency):
+        decoder = self.make_decoder(video_path)
+        exporter = VideoExporter(output_path, decoder.fps, tracker.renderer.output_size(*decoder.frame_size),
+                                 max_queue_size=2 * self.args.batch_size)
+        if not exporter.start():
+            decoder.close()
+            raise IOError(exporter.error)
+        for batch_start, batch in self._batches(decoder, latency):
+            store = entry.store(batch_start, batch_start + len(batch))
+            _, colors, has_ball = tracker.annotate_rows(batch, store, batch_start)
+            with latency.measure("render"):
+                annotated = tracker.renderer.draw_store(batch, store, batch_start, colors, has_ball)
+            with latency.measure("export"):
+                for frame, annotated_frame in zip(batch, annotated):
+                    if annotated_frame is frame:
+                        exporter.write(annotated_frame, on_written=decoder.release)
+                    else:
+                        exporter.write(annotated_frame)
+                        decoder.release(frame)
+        exporter.close()
+        if exporter.error:
+            raise IOError(exporter.error)
+        share = tracker.possession.stats()["team_share"]
+        if share is not None:
+            print(f"Possession : équipe 1 {share[0]:.0%}, équipe 2 {share[1]:.0%}")
+
+    @staticmethod
+    def _summary(name, frames, analysed, resumed, elapsed, latency):
+        stages = latency.to_dict()
+        details = ", ".join(f"{stage} {stats['mean_ms'] * stats['count'] / 1000:.1f}s"
+                            for stage, stats in stages.items() if stats["count"])
+        resume_note = f", reprise à {resumed}" if resumed else ""
+        fps = analysed / elapsed if analysed else frames / elapsed
+        print(f"{name} : {frames} frames ({analysed} analysées{resume_note}) en {elapsed:.1f}s "
+              f"-> {fps:.1f} frames/s | {details}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse hors ligne d'un dossier de vidéos de matchs")
+    parser.add_argument("inputs", nargs="+", help="Dossiers, motifs glob ou fichiers vidéo")
+    parser.add_argument("--output", default="outputs/batch")
+    parser.add_argument("--format", choices=("auto", "parquet", "npz"), default="auto",
+                        help="auto : Parquet si pyarrow est installé, NPZ sinon")
+    parser.add_argument("--annotate", action="store_true", help="Écrit aussi la vidéo annotée")
+    parser.add_argument("--force", action="store_true", help="Retraite les vidéos déjà exportées")
+    parser.add_argument("--teams", action="store_true", help="Vidéo annotée aux couleurs des équipes")
+    parser.add_argument("--model", default="models/best.pt")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch")
+    parser.add_argument("--precision", choices=("fp32", "fp16", "int8"), default="fp32")
+    parser.add_argument("--conf", type=float, default=0.1)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch-size", type=int, default=32, help="Frames par lot de suivi")
+    parser.add_argument("--stride", type=int, default=1)
+    parser.add_argument("--motion-threshold", type=float, default=None)
+    parser.add_argument("--ball-search", choices=BallSearch.MODES, default=None)
+    parser.add_argument("--max-width", type=int, default=None, help="Réduction des frames dès le décodage")
+    parser.add_argument("--cache-dir", default="cache")
+    parser.add_argument("--cache-max-gb", type=float, default=5)
+    args = parser.parse_args()
+
+    videos = list_videos(args.inputs)
+    if not videos:
+        parser.error("Aucune vidéo trouvée")
+    runner = BatchRunner(args)
+    print(f"{len(videos)} vidéo(s), suivis au format {runner.format}")
+    names = output_names(videos)
+    failures = 0
+    for video_path in videos:
+        try:
+            runner.process(video_path, names[video_path])
+        except Exception as e:
+            failures += 1
+            print(f"Erreur sur {video_path} : {e}")
+    if failures:
+        raise SystemExit(f"{failures} vidéo(s) en erreur")
+
+
+if __name__ == '__main__':
+    main()
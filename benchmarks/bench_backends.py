@@ -0,0 +1,106 @@
+# Comparaison des backends d'inférence : latence et dérive du mAP par rapport à PyTorch fp32
+#
+# Exemple :
+#   python benchmarks/bench_backends.py clip.mp4 --configs pytorch:fp32 onnx:fp32 onnx:int8 openvino:fp16 openvino:int8
+#
+# La référence (première configuration) tient lieu de vérité terrain : le mAP@0.5 de chaque
+# backend mesure l'écart introduit par l'export et la quantification.
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_export import exported_model_path  # noqa: E402
+from model_registry import SharedModel  # noqa: E402
+from inference_pool import to_supervision  # noqa: E402
+from stride_report import read_frames, iou_matrix  # noqa: E402
+
+
+def run_backend(model, frames, conf, imgsz):
+    model.warmup(imgsz)
+    latencies, detections = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        result = model.predict([frame], conf=conf, imgsz=imgsz)[0]
+        latencies.append(time.perf_counter() - start)
+        detections.append(to_supervision(result))
+    return np.array(latencies), detections
+
+
+def average_precision(reference, candidate, class_id, iou_threshold=0.5):
+    """
+    AP (aire sous la courbe précision/rappel interpolée) d'une classe.
+    """
+    scores, matches, total_ref = [], [], 0
+    for ref, cand in zip(reference, candidate):
+        ref_boxes = ref.xyxy[ref.class_id == class_id]
+        selected = cand.class_id == class_id
+        cand_boxes, cand_conf = cand.xyxy[selected], cand.confidence[selected]
+        total_ref += len(ref_boxes)
+        order = np.argsort(-cand_conf)
+        ious = iou_matrix(cand_boxes[order], ref_boxes)
+        used = np.zeros(len(ref_boxes), bool)
+        for i, score in enumerate(cand_conf[order]):
+            best = int(np.argmax(ious[i])) if ious.shape[1] else -1
+            hit = best >= 0 and ious[i, best] >= iou_threshold and not used[best]
+            if hit:
+                used[best] = True
+            scores.append(score)
+            matches.append(hit)
+    if total_ref == 0:
+        return None
+    if not scores:
+        return 0.0
+    hits = np.asarray(matches)[np.argsort(-np.asarray(scores))]
+    tp = np.cumsum(hits)
+    recall = np.concatenate([[0], tp / total_ref, [1]])
+    precision = np.concatenate([[1], tp / np.arange(1, len(hits) + 1), [0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    return float(np.sum((recall[1:] - recall[:-1]) * precision[1:]))
+
+
+def mean_average_precision(reference, candidate, class_ids):
+    aps = [average_precision(reference, candidate, class_id) for class_id in class_ids]
+    aps = [ap for ap in aps if ap is not None]
+    return float(np.mean(aps)) if aps else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence et dérive du mAP des backends d'inférence")
+    parser.add_argument("video")
+    parser.add_argument("--model", default="models/best.pt")
+    parser.add_argument("--configs", nargs="+",
+                        default=["pytorch:fp32", "onnx:fp32", "onnx:int8", "openvino:fp32",
+                                 "openvino:fp16", "openvino:int8"])
+    parser.add_argument("--calibration-data", default=None)
+    parser.add_argument("--max-frames", type=int, default=100)
+    parser.add_argument("--conf", type=float, default=0.1)
+    parser.add_argument("--imgsz", type=int, default=640)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.max_frames)
+    reference = None
+    class_ids = None
+    print(f"{len(frames)} frames, imgsz={args.imgsz}")
+    print(f"{'backend':<18}{'moy. ms':>10}{'p95 ms':>10}{'fps':>8}{'mAP@0.5':>10}{'dérive':>9}")
+    for config in args.configs:
+        backend, precision = config.split(":")
+        try:
+            path = exported_model_path(args.model, backend, precision, calibration_data=args.calibration_data)
+            model = SharedModel(path)
+        except Exception as e:
+            print(f"{config:<18}indisponible : {e}")
+            continue
+        latencies, detections = run_backend(model, frames, args.conf, args.imgsz)
+        if reference is None:
+            reference = detections
+            class_ids = sorted(model.names)
+        map50 = mean_average_precision(reference, detections, class_ids)
+        print(f"{config:<18}{1000 * latencies.mean():>10.2f}{1000 * np.percentile(latencies, 95):>10.2f}"
+              f"{1 / latencies.mean():>8.1f}{map50:>10.3f}{1 - map50:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# Coût par frame et rappel du ballon selon la taille d'inférence et la seconde passe (recadrage / tuiles)
+#
+# Exemple :
+#   python benchmarks/bench_ball_search.py clip.mp4 --imgsz 640 960 --modes crop tiles both
+#
+# La référence est une inférence pleine frame à --reference-imgsz avec recherche par tuiles ;
+# le rappel compte les frames où la référence voit le ballon et où la configuration le détecte
+# (hors positions interpolées) à moins de --max-distance pixels.
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ball_search import BallSearch  # noqa: E402
+from model_registry import get_model  # noqa: E402
+from stride_report import read_frames, run_tracker  # noqa: E402
+
+
+def ball_centers(tracks):
+    """
+    Centre du ballon détecté (non interpolé) par frame, ou None.
+    """
+    centers = []
+    for frame_balls in tracks["ball"]:
+        ball = frame_balls.get(1)
+        if ball is None or ball.get("interpolated"):
+            centers.append(None)
+        else:
+            x1, y1, x2, y2 = ball["bbox"]
+            centers.append(np.array([(x1 + x2) / 2, (y1 + y2) / 2]))
+    return centers
+
+
+def ball_recall(reference, candidate, max_distance):
+    ref_frames = [(i, c) for i, c in enumerate(reference) if c is not None]
+    if not ref_frames:
+        return 1.0
+    hits = sum(1 for i, c in ref_frames
+               if candidate[i] is not None and np.linalg.norm(candidate[i] - c) <= max_distance)
+    return hits / len(ref_frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Taille d'inférence et recherche ciblée du ballon")
+    parser.add_argument("video")
+    parser.add_argument("--model", default="models/best.pt")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640, 960])
+    parser.add_argument("--modes", nargs="+", default=["crop", "tiles", "both"], choices=BallSearch.MODES)
+    parser.add_argument("--reference-imgsz", type=int, default=1280)
+    parser.add_argument("--max-distance", type=float, default=15.0)
+    parser.add_argument("--max-frames", type=int, default=300)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.max_frames)
+    model = get_model(args.model)
+    model.warmup()
+
+    reference_tracks, _ = run_tracker(model, frames, imgsz=args.reference_imgsz,
+                                      ball_search=BallSearch("tiles", tile_interval=1, lost_after=0))
+    reference = ball_centers(reference_tracks)
+    seen = sum(c is not None for c in reference)
+    print(f"{len(frames)} frames, ballon visible dans {seen} frames de la référence (imgsz={args.reference_imgsz})")
+    print(f"{'configuration':<28}{'ms/frame':>10}{'ballon':>9}{'rappel':>9}{'passes':>16}")
+
+    for imgsz in args.imgsz:
+        for mode in [None] + args.modes:
+            ball_search = BallSearch(mode) if mode else None
+            tracks, elapsed = run_tracker(model, frames, imgsz=imgsz, ball_search=ball_search)
+            centers = ball_centers(tracks)
+            detected = sum(c is not None for c in centers) / len(frames)
+            passes = (f"{ball_search.crops}c/{ball_search.tile_runs}t" if ball_search else "-")
+            print(f"{f'imgsz={imgsz} ' + (mode or 'plein cadre'):<28}{1000 * elapsed / len(frames):>10.2f}"
+                  f"{detected:>9.3f}{ball_recall(reference, centers, args.max_distance):>9.3f}{passes:>16}")
+
+
+if __name__ == '__main__':
+    main()
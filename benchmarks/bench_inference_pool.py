@@ -0,0 +1,65 @@
+# Benchmark de montée en charge : modèle en processus unique contre InferencePool à 1..N workers
+#
+# Exemple :
+#   python benchmarks/bench_inference_pool.py input_videos/match.mp4 --model models/best.pt --max-workers 4
+import argparse
+import os
+import sys
+import time
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference_pool import InferencePool  # noqa: E402
+from model_registry import get_model  # noqa: E402
+
+
+def read_frames(video_path, max_frames):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def bench(model, frames, batch_size, conf, imgsz):
+    # Une passe de chauffe (allocation des buffers, premiers appels du modèle)
+    model.predict(frames[:batch_size], conf=conf, imgsz=imgsz)
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        model.predict(frames[i:i + batch_size], conf=conf, imgsz=imgsz)
+    return len(frames) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit d'inférence selon le nombre de workers")
+    parser.add_argument("video")
+    parser.add_argument("--model", default="models/best.pt")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-frames", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--conf", type=float, default=0.1)
+    parser.add_argument("--imgsz", type=int, default=640)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.max_frames)
+    if not frames:
+        sys.exit(f"Impossible de lire {args.video}")
+    print(f"{len(frames)} frames, batch {args.batch_size}, {os.cpu_count()} cœurs")
+
+    baseline = bench(get_model(args.model), frames, args.batch_size, args.conf, args.imgsz)
+    print(f"{'processus unique':<20}{baseline:>10.1f} fps")
+    for workers in range(1, args.max_workers + 1):
+        pool = InferencePool(args.model, workers=workers)
+        try:
+            fps = bench(pool, frames, args.batch_size, args.conf, args.imgsz)
+        finally:
+            pool.close()
+        print(f"{f'{workers} worker(s)':<20}{fps:>10.1f} fps   x{fps / baseline:.2f}")
+
+
+if __name__ == '__main__':
+    main()
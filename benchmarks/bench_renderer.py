@@ -0,0 +1,102 @@
+# Micro-benchmark : ancien rendu (copie + appels cv2 par objet) contre AnnotationRenderer
+#
+# Exemple :
+#   python benchmarks/bench_renderer.py --width 1280 --height 720 --players 22 --frames 300
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from renderer import AnnotationRenderer  # noqa: E402
+from utils import get_center_of_bbox, get_bbox_width  # noqa: E402
+import cv2  # noqa: E402
+
+
+def synthetic_tracks(n_frames, width, height, n_players, n_referees, seed=0):
+    rng = np.random.default_rng(seed)
+    tracks = {"players": [], "referees": [], "ball": []}
+    for _ in range(n_frames):
+        for object, count, size in (("players", n_players, (30, 70)), ("referees", n_referees, (30, 70))):
+            x = rng.uniform(0, width - size[0], count)
+            y = rng.uniform(0, height - size[1], count)
+            tracks[object].append({i + 1: {"bbox": [x[i], y[i], x[i] + size[0], y[i] + size[1]],
+                                           "class_name": "player" if object == "players" else "referee"}
+                                   for i in range(count)})
+        bx, by = rng.uniform(0, width - 10), rng.uniform(0, height - 10)
+        tracks["ball"].append({1: {"bbox": [bx, by, bx + 10, by + 10]}})
+    return tracks
+
+
+def legacy_draw_annotations(video_frames, tracks):
+    """
+    Rendu d'origine : copie de chaque frame puis un appel cv2 par objet.
+    """
+    def draw_ellipse(frame, bbox, color, class_name=""):
+        y2 = int(bbox[3])
+        x_center, _ = get_center_of_bbox(bbox)
+        width = get_bbox_width(bbox)
+        cv2.ellipse(frame, center=(x_center, y2), axes=(int(width), int(0.35 * width)), angle=0.0,
+                    startAngle=-45, endAngle=235, color=color, thickness=2, lineType=cv2.LINE_4)
+        cv2.putText(frame, class_name, (int(x_center - 30), int(y2 + 20)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+
+    def draw_triangle(frame, bbox, color):
+        y = int(bbox[1])
+        x, _ = get_center_of_bbox(bbox)
+        points = np.array([[x, y], [x - 10, y - 20], [x + 10, y - 20]])
+        cv2.drawContours(frame, [points], 0, color, cv2.FILLED)
+        cv2.drawContours(frame, [points], 0, (0, 0, 0), 2)
+
+    output = []
+    for frame_num, frame in enumerate(video_frames):
+        frame = frame.copy()
+        for _, player in tracks["players"][frame_num].items():
+            draw_ellipse(frame, player["bbox"], player.get("team_color", (0, 100, 255)), player["class_name"])
+        for _, referee in tracks["referees"][frame_num].items():
+            draw_ellipse(frame, referee["bbox"], (0, 255, 255))
+        for _, ball in tracks["ball"][frame_num].items():
+            draw_triangle(frame, ball["bbox"], (0, 255, 0))
+        output.append(frame)
+    return output
+
+
+def bench(name, fn, frames, tracks, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        batch_tracks = {object: tracks[object][i:i + batch_size] for object in tracks}
+        fn(frames[i:i + batch_size], batch_tracks)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32}{len(frames) / elapsed:>10.1f} fps{1000 * elapsed / len(frames):>10.2f} ms/frame")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du rendu des annotations")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--referees", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--overlay-scale", type=float, default=0.5)
+    args = parser.parse_args()
+
+    base = np.full((args.height, args.width, 3), (40, 140, 40), np.uint8)
+    tracks = synthetic_tracks(args.frames, args.width, args.height, args.players, args.referees)
+
+    # Chaque variante reçoit ses propres frames (le nouveau rendu dessine sur place)
+    legacy = bench("legacy (copie + cv2 par objet)", legacy_draw_annotations,
+                   [base.copy() for _ in range(args.frames)], tracks, args.batch_size)
+    renderer = AnnotationRenderer()
+    vectorized = bench("AnnotationRenderer", renderer.draw_annotations,
+                       [base.copy() for _ in range(args.frames)], tracks, args.batch_size)
+    if args.overlay_scale != 1.0:
+        scaled = AnnotationRenderer(overlay_scale=args.overlay_scale)
+        bench(f"AnnotationRenderer x{args.overlay_scale}", scaled.draw_annotations,
+              [base.copy() for _ in range(args.frames)], tracks, args.batch_size)
+    print(f"Accélération : x{legacy / vectorized:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+# Suite de benchmarks reproductible : étapes isolées et pipeline complet sur clips synthétiques
+#
+# Exemples :
+#   python benchmarks/harness.py                              # toutes les étapes, résultats JSON
+#   python benchmarks/harness.py --save-baseline              # enregistre la référence
+#   python benchmarks/harness.py --check                      # échoue en cas de régression
+#   python benchmarks/harness.py --cases end_to_end --read-batch 10 --detect-batch 40
+#
+# Chaque cas s'exécute dans un processus neuf : le pic de mémoire (RSS) mesuré lui est propre.
+# Aucun poids, réseau ni GPU n'est nécessaire (détecteur factice, voir synthetic.StubDetector).
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(BENCH_DIR))
+sys.path.append(BENCH_DIR)
+from synthetic import generate_clip, StubDetector  # noqa: E402
+
+CASES = ("decode", "detect", "tracking", "render", "jpeg_encode", "export", "end_to_end")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+def peak_rss_mb():
+    # ru_maxrss : kilo-octets sous Linux, octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def load_frames(clip):
+    import cv2
+    cap = cv2.VideoCapture(clip)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def batches(frames, batch_size):
+    for i in range(0, len(frames), batch_size):
+        yield i, frames[i:i + batch_size]
+
+
+def case_decode(clip, options):
+    from decoder import VideoDecoder
+    decoder = VideoDecoder(clip, buffer_count=8, max_width=options["decode_max_width"])
+    decoder.open()
+    start = time.perf_counter()
+    frames = 0
+    while True:
+        decoded = decoder.read()
+        if decoded is None:
+            break
+        decoder.release(decoded[1])
+        frames += 1
+    decoder.close()
+    return frames, time.perf_counter() - start
+
+
+def case_detect(clip, options):
+    frames = load_frames(clip)
+    detector = StubDetector(options["stub_latency_ms"])
+    start = time.perf_counter()
+    for _, batch in batches(frames, options["detect_batch"]):
+        detector.predict(batch)
+    return len(frames), time.perf_counter() - start
+
+
+def case_tracking(clip, options):
+    from tracker import Tracker
+    frames = load_frames(clip)
+    tracker = Tracker(model=StubDetector(options["stub_latency_ms"]), batch_size=options["detect_batch"])
+    start = time.perf_counter()
+    for _, batch in batches(frames, options["read_batch"]):
+        tracker.update_store(batch)
+    return len(frames), time.perf_counter() - start
+
+
+def _tracked(frames, options):
+    from tracker import Tracker
+    tracker = Tracker(model=StubDetector(), batch_size=options["detect_batch"])
+    return tracker, [(start, batch, tracker.update_store(batch))
+                     for start, batch in batches(frames, options["read_batch"])]
+
+
+def case_render(clip, options):
+    tracker, tracked = _tracked(load_frames(clip), options)
+    start = time.perf_counter()
+    for batch_start, batch, store in tracked:
+        tracker.renderer.draw_store(batch, store, batch_start)
+    return sum(len(batch) for _, batch, _ in tracked), time.perf_counter() - start
+
+
+def case_jpeg_encode(clip, options):
+    from broadcaster import FrameBroadcaster
+    frames = load_frames(clip)
+    broadcaster = FrameBroadcaster()
+    start = time.perf_counter()
+    for frame in frames:
+        broadcaster.publish(broadcaster.prepare(frame))
+    return len(frames), time.perf_counter() - start
+
+
+def case_export(clip, options):
+    from exporter import VideoExporter
+    frames = load_frames(clip)
+    height, width = frames[0].shape[:2]
+    with tempfile.TemporaryDirectory() as tmp:
+        exporter = VideoExporter(os.path.join(tmp, "export.mp4"), 25, (width, height),
+                                 max_queue_size=options["export_queue"])
+        exporter.start()
+        start = time.perf_counter()
+        for frame in frames:
+            exporter.write(frame)
+        exporter.close()
+        return len(frames), time.perf_counter() - start
+
+
+def case_end_to_end(clip, options):
+    """
+    Pipeline du serveur (VideoProcessor : décodage, suivi, rendu, export) avec le détecteur factice.
+    """
+    import app
+    app.inference_pool = StubDetector(options["stub_latency_ms"])  # Remplace le modèle de detection_model()
+    app.Config.USE_DETECTION_CACHE = False
+    app.Config.READ_BATCH_SIZE = options["read_batch"]
+    app.Config.DETECT_BATCH_SIZE = options["detect_batch"]
+    app.Config.FRAME_QUEUE_SIZE = options["frame_queue"]
+    app.Config.EXPORT_QUEUE_SIZE = options["export_queue"]
+    app.Config.DECODE_MAX_WIDTH = options["decode_max_width"]
+    with tempfile.TemporaryDirectory() as tmp:
+        app.Config.OUTPUT_FOLDER = tmp
+        processor = app.VideoProcessor(job_id="bench")
+        start = time.perf_counter()
+        processor.set_video(clip)
+        processor.join()
+        processor.exporter.close()
+        elapsed = time.perf_counter() - start
+        stages = processor.latency.to_dict()
+    return processor.processed_frames, elapsed, stages
+
+
+def run_case(name, clip, options):
+    """
+    Exécuté dans un processus dédié.
+    """
+    result = globals()[f"case_{name}"](clip, options)
+    frames, elapsed = result[0], result[1]
+    output = {
+        "frames": frames,
+        "seconds": round(elapsed, 4),
+        "fps": round(frames / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    if len(result) > 2:
+        output["stages"] = result[2]
+    return output
+
+
+def compare(results, baseline, max_throughput_drop, max_rss_increase):
+    """
+    Régressions par rapport à la référence (débit plus faible ou pic mémoire plus élevé que le seuil).
+    """
+    if baseline.get("config") != results["config"]:
+        print("Attention : la configuration diffère de celle de la référence")
+    failures = []
+    for name, current in results["cases"].items():
+        reference = baseline["cases"].get(name)
+        if reference is None:
+            continue
+        if reference["fps"] and current["fps"] < reference["fps"] * (1 - max_throughput_drop):
+            failures.append(f"{name} : {current['fps']} fps contre {reference['fps']} (référence)")
+        if current["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + max_rss_increase):
+            failures.append(f"{name} : pic RSS {current['peak_rss_mb']} Mo contre {reference['peak_rss_mb']} Mo")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du pipeline sur clips synthétiques")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--referees", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--read-batch", type=int, default=5, help="Config.READ_BATCH_SIZE")
+    parser.add_argument("--detect-batch", type=int, default=20, help="Config.DETECT_BATCH_SIZE")
+    parser.add_argument("--frame-queue", type=int, default=20, help="Config.FRAME_QUEUE_SIZE")
+    parser.add_argument("--export-queue", type=int, default=30, help="Config.EXPORT_QUEUE_SIZE")
+    parser.add_argument("--decode-max-width", type=int, default=None)
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0,
+                        help="Coût simulé de l'inférence par frame")
+    parser.add_argument("--repeat", type=int, default=3, help="Exécutions par cas (meilleur débit conservé)")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results", "latest.json"))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Code de sortie 1 en cas de régression")
+    parser.add_argument("--max-throughput-drop", type=float, default=0.15)
+    parser.add_argument("--max-rss-increase", type=float, default=0.20)
+    args = parser.parse_args()
+
+    clip_config = {"width": args.width, "height": args.height, "frames": args.frames,
+                   "players": args.players, "referees": args.referees, "seed": args.seed}
+    options = {"read_batch": args.read_batch, "detect_batch": args.detect_batch,
+               "frame_queue": args.frame_queue, "export_queue": args.export_queue,
+               "decode_max_width": args.decode_max_width, "stub_latency_ms": args.stub_latency_ms}
+
+    # Clip généré une fois par configuration puis réutilisé
+    clip_name = "clip_{width}x{height}_{frames}f_{players}p_{referees}r_s{seed}.mp4".format(**clip_config)
+    clip = os.path.join(tempfile.gettempdir(), "football_bench", clip_name)
+    if not os.path.exists(clip):
+        print(f"Génération de {clip}...")
+        generate_clip(clip, args.width, args.height, args.frames, args.players, args.referees, seed=args.seed)
+
+    results = {
+        "config": dict(clip_config, **options),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cases": {},
+    }
+    print(f"{'cas':<14}{'fps':>10}{'secondes':>10}{'pic RSS (Mo)':>14}")
+    ctx = mp.get_context("spawn")
+    for name in args.cases:
+        runs = []
+        for _ in range(args.repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+                runs.append(executor.submit(run_case, name, clip, options).result())
+        best = max(runs, key=lambda run: run["fps"] or 0)
+        best["peak_rss_mb"] = max(run["peak_rss_mb"] for run in runs)
+        results["cases"][name] = best
+        print(f"{name:<14}{best['fps']:>10.1f}{best['seconds']:>10.2f}{best['peak_rss_mb']:>14.1f}")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Résultats : {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Référence enregistrée : {args.baseline}")
+    elif args.check:
+        if not os.path.exists(args.baseline):
+            sys.exit(f"Aucune référence ({args.baseline}) : lancer d'abord --save-baseline")
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.max_throughput_drop, args.max_rss_increase)
+        if failures:
+            print("Régressions :")
+            for failure in failures:
+                print(f"  - {failure}")
+            sys.exit(1)
+        print("Aucune régression par rapport à la référence")
+
+
+if __name__ == '__main__':
+    main()
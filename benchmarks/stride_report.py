@@ -0,0 +1,137 @@
+# Compromis vitesse / qualité du saut de frames sur un clip de référence
+#
+# Exemple :
+#   python benchmarks/stride_report.py clip.mp4 --strides 1 2 3 5 --motion-threshold 12
+#
+# La référence est le suivi avec détection sur chaque frame (stride 1) ; chaque
+# configuration est comparée à celle-ci (rappel à IoU >= 0.5 et IDF1 joueurs/arbitres).
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracker import Tracker  # noqa: E402
+from model_registry import get_model  # noqa: E402
+
+
+def read_frames(video_path, max_frames=None):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while max_frames is None or len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def run_tracker(model, frames, batch_size=5, **options):
+    tracker = Tracker(model=model, **options)
+    tracks = {"players": [], "referees": [], "ball": []}
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        batch_tracks = tracker.update(frames[i:i + batch_size])
+        for object in tracks:
+            tracks[object] += batch_tracks[object]
+    return tracks, time.perf_counter() - start
+
+
+def iou_matrix(boxes_a, boxes_b):
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)))
+    a = np.asarray(boxes_a, dtype=np.float32)[:, None, :]
+    b = np.asarray(boxes_b, dtype=np.float32)[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+def compare(reference, candidate, objects=("players", "referees"), iou_threshold=0.5):
+    """
+    Rappel (boîtes de référence retrouvées) et IDF1 (cohérence des identifiants dans le temps).
+    """
+    matched = 0
+    total_ref = 0
+    total_cand = 0
+    pair_counts = {}
+    for object in objects:
+        for ref_frame, cand_frame in zip(reference[object], candidate[object]):
+            ref_ids, ref_boxes = list(ref_frame.keys()), [t["bbox"] for t in ref_frame.values()]
+            cand_ids, cand_boxes = list(cand_frame.keys()), [t["bbox"] for t in cand_frame.values()]
+            total_ref += len(ref_ids)
+            total_cand += len(cand_ids)
+            ious = iou_matrix(ref_boxes, cand_boxes)
+            if ious.size == 0:
+                continue
+            rows, cols = linear_sum_assignment(-ious)
+            for r, c in zip(rows, cols):
+                if ious[r, c] >= iou_threshold:
+                    matched += 1
+                    pair = (object, ref_ids[r], cand_ids[c])
+                    pair_counts[pair] = pair_counts.get(pair, 0) + 1
+
+    # IDF1 : association globale identifiant de référence <-> identifiant candidat
+    idtp = 0
+    if pair_counts:
+        ref_keys = sorted({(o, r) for o, r, _ in pair_counts})
+        cand_keys = sorted({(o, c) for o, _, c in pair_counts})
+        ref_index = {k: i for i, k in enumerate(ref_keys)}
+        cand_index = {k: i for i, k in enumerate(cand_keys)}
+        counts = np.zeros((len(ref_keys), len(cand_keys)))
+        for (o, r, c), n in pair_counts.items():
+            counts[ref_index[(o, r)], cand_index[(o, c)]] = n
+        rows, cols = linear_sum_assignment(-counts)
+        idtp = counts[rows, cols].sum()
+
+    recall = matched / total_ref if total_ref else 1.0
+    idf1 = 2 * idtp / (total_ref + total_cand) if total_ref + total_cand else 1.0
+    return recall, idf1
+
+
+def ball_recall(reference, candidate):
+    ref_frames = [i for i, f in enumerate(reference["ball"]) if 1 in f]
+    if not ref_frames:
+        return 1.0
+    return sum(1 for i in ref_frames if 1 in candidate["ball"][i]) / len(ref_frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rapport vitesse / qualité du saut de frames")
+    parser.add_argument("video")
+    parser.add_argument("--model", default="models/best.pt")
+    parser.add_argument("--strides", type=int, nargs="+", default=[2, 3, 5])
+    parser.add_argument("--motion-threshold", type=float, default=None,
+                        help="Ajoute une configuration adaptative (stride max = plus grand stride)")
+    parser.add_argument("--max-frames", type=int, default=500)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.max_frames)
+    model = get_model(args.model)
+    model.warmup()
+
+    reference, ref_time = run_tracker(model, frames)
+    configs = [(f"stride={stride}", {"detect_stride": stride}) for stride in args.strides if stride > 1]
+    if args.motion_threshold is not None:
+        configs.append((f"adaptive(max={max(args.strides)}, seuil={args.motion_threshold})",
+                        {"detect_stride": max(args.strides), "motion_threshold": args.motion_threshold}))
+
+    print(f"{len(frames)} frames, référence (stride=1) : {len(frames) / ref_time:.1f} fps")
+    print(f"{'configuration':<36}{'fps':>8}{'gain':>8}{'rappel':>9}{'IDF1':>8}{'ballon':>9}")
+    print(f"{'stride=1':<36}{len(frames) / ref_time:>8.1f}{1.0:>8.2f}{1.0:>9.3f}{1.0:>8.3f}{1.0:>9.3f}")
+    for name, options in configs:
+        candidate, elapsed = run_tracker(model, frames, **options)
+        recall, idf1 = compare(reference, candidate)
+        print(f"{name:<36}{len(frames) / elapsed:>8.1f}{ref_time / elapsed:>8.2f}"
+              f"{recall:>9.3f}{idf1:>8.3f}{ball_recall(reference, candidate):>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# Vidéos synthétiques de type terrain de football et détecteur factice (sans poids ni GPU)
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference_pool import PoolResult  # noqa: E402
+
+PITCH_COLOR = (40, 140, 40)
+LINE_COLOR = (90, 190, 90)  # Lignes atténuées : le blanc est réservé au ballon
+TEAM_COLORS = ((0, 0, 220), (220, 0, 0))
+REFEREE_COLOR = (0, 220, 220)
+BALL_COLOR = (255, 255, 255)
+NAMES = {0: 'ball', 1: 'goalkeeper', 2: 'player', 3: 'referee'}
+
+
+def generate_clip(path, width=1280, height=720, n_frames=300, players=22, referees=3, fps=25, seed=0):
+    """
+    Écrit un clip : terrain vert, joueurs (deux couleurs d'équipe), arbitres et ballon en mouvement
+    régulier avec rebonds sur les bords. Retourne le chemin du fichier.
+    """
+    rng = np.random.default_rng(seed)
+    scale = height / 720
+    size = np.array([22, 55]) * scale
+    count = players + referees
+    positions = rng.uniform([0, 0], [width - size[0], height - size[1]], (count, 2))
+    velocities = rng.uniform(-4, 4, (count, 2)) * scale
+    colors = [TEAM_COLORS[i % 2] for i in range(players)] + [REFEREE_COLOR] * referees
+    ball = np.array([width / 2, height / 2])
+    ball_velocity = rng.uniform(-9, 9, 2) * scale
+    ball_radius = max(3, int(6 * scale))
+
+    background = np.full((height, width, 3), PITCH_COLOR, np.uint8)
+    cv2.line(background, (width // 2, 0), (width // 2, height), LINE_COLOR, 2)
+    cv2.circle(background, (width // 2, height // 2), int(90 * scale), LINE_COLOR, 2)
+    cv2.rectangle(background, (0, height // 4), (int(120 * scale), 3 * height // 4), LINE_COLOR, 2)
+    cv2.rectangle(background, (width - int(120 * scale), height // 4), (width - 1, 3 * height // 4), LINE_COLOR, 2)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for _ in range(n_frames):
+        frame = background.copy()
+        for (x, y), color in zip(positions.astype(int), colors):
+            cv2.rectangle(frame, (x, y), (x + int(size[0]), y + int(size[1])), color, -1)
+        cv2.circle(frame, (int(ball[0]), int(ball[1])), ball_radius, BALL_COLOR, -1)
+        writer.write(frame)
+
+        positions += velocities
+        bounce = (positions < 0) | (positions > [width - size[0], height - size[1]])
+        velocities[bounce] *= -1
+        positions = np.clip(positions, 0, [width - size[0], height - size[1]])
+        ball += ball_velocity
+        ball_bounce = (ball < ball_radius) | (ball > [width - ball_radius, height - ball_radius])
+        ball_velocity[ball_bounce] *= -1
+    writer.release()
+    return path
+
+
+class StubDetector:
+    """
+    Remplace le modèle YOLO : segmente les couleurs du clip synthétique (équipes, arbitre, ballon)
+    et retourne des PoolResult, comme le pool d'inférence. Fonctionne aussi sur des recadrages.
+    latency_ms simule en plus le coût d'une vraie inférence.
+    """
+
+    names = NAMES
+
+    def __init__(self, latency_ms=0.0, min_area=12):
+        self.latency_ms = latency_ms
+        self.min_area = min_area
+
+    def predict(self, frames, conf=0.25, imgsz=640, **kwargs):
+        results = [self._detect(frame) for frame in frames]
+        if self.latency_ms:
+            time.sleep(self.latency_ms * len(frames) / 1000)
+        return results
+
+    def _detect(self, frame):
+        # Seuils BGR tolérants à la compression vidéo
+        masks = (
+            (2, cv2.inRange(frame, (0, 0, 150), (90, 90, 255)) | cv2.inRange(frame, (150, 0, 0), (255, 90, 90))),
+            (3, cv2.inRange(frame, (0, 150, 150), (90, 255, 255))),
+            (0, cv2.inRange(frame, (200, 200, 200), (255, 255, 255))),
+        )
+        boxes, class_ids = [], []
+        for class_id, mask in masks:
+            _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+            for x, y, w, h, area in stats[1:]:
+                if area >= self.min_area:
+                    boxes.append((x, y, x + w, y + h))
+                    class_ids.append(class_id)
+        xyxy = np.asarray(boxes, np.float32).reshape(-1, 4)
+        return PoolResult(self.names, xyxy, np.full(len(xyxy), 0.9, np.float32), np.asarray(class_ids, int))
+
+    def warmup(self, imgsz=640):
+        pass
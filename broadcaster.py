@@ -0,0 +1,135 @@
+# Diffusion du flux vidéo : un seul encodage JPEG par frame, partagé par tous les spectateurs
+import threading
+import time
+import cv2
+from metrics import FRAMES_DROPPED
+
+
+class ClientStats:
+    """
+    Débit et fps effectivement servis à un spectateur.
+    """
+
+    def __init__(self, client_id):
+        self.client_id = client_id
+        self.connected_at = time.time()
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.frames_skipped = 0  # Versions sautées (spectateur plus lent que la production)
+        self.last_version = 0
+
+    def record(self, version, size):
+        if self.last_version:
+            skipped = max(0, version - self.last_version - 1)
+            if skipped:
+                self.frames_skipped += skipped
+                FRAMES_DROPPED.inc(skipped, reason="stream_skip")
+        self.last_version = version
+        self.frames_sent += 1
+        self.bytes_sent += size
+
+    def to_dict(self):
+        elapsed = max(time.time() - self.connected_at, 1e-6)
+        return {
+            "client_id": self.client_id,
+            "connected_s": round(elapsed, 1),
+            "frames_sent": self.frames_sent,
+            "frames_skipped": self.frames_skipped,
+            "fps": round(self.frames_sent / elapsed, 2),
+            "bandwidth_kbps": round(self.bytes_sent * 8 / 1000 / elapsed, 1),
+        }
+
+
+class FrameBroadcaster:
+    """
+    Encode chaque frame publiée une seule fois et la place dans un anneau versionné.
+    Les spectateurs lisent toujours la version la plus récente : un client lent saute
+    des frames au lieu de ralentir la détection.
+    """
+
+    def __init__(self, quality=80, max_width=None, ring_size=4, latency=None):
+        self.quality = quality
+        self.max_width = max_width
+        self.ring_size = ring_size
+        self.version = 0
+        self.closed = False
+        self._ring = [None] * ring_size  # (version, jpeg)
+        self._cond = threading.Condition()
+        self._clients = {}
+        self._next_client_id = 0
+        self.frames_encoded = 0
+        self.latency = latency  # LatencyTracker facultatif (étape jpeg_encode)
+
+    @property
+    def has_clients(self):
+        return bool(self._clients)
+
+    def prepare(self, frame):
+        """
+        Frame à l'échelle du flux, modifiable sans toucher à l'originale.
+        """
+        height, width = frame.shape[:2]
+        if self.max_width and width > self.max_width:
+            return cv2.resize(frame, (self.max_width, int(height * self.max_width / width)),
+                              interpolation=cv2.INTER_AREA)
+        return frame.copy()
+
+    def publish(self, frame):
+        """
+        Encode la frame (déjà préparée) et la rend disponible à tous les spectateurs.
+        """
+        start = time.perf_counter()
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if self.latency is not None:
+            self.latency.record("jpeg_encode", time.perf_counter() - start)
+        if not ok:
+            return
+        jpeg = buffer.tobytes()
+        with self._cond:
+            self.version += 1
+            self._ring[self.version % self.ring_size] = (self.version, jpeg)
+            self.frames_encoded += 1
+            self._cond.notify_all()
+
+    def latest(self):
+        with self._cond:
+            return self._ring[self.version % self.ring_size] if self.version else None
+
+    def wait_for(self, last_version, timeout=None):
+        """
+        Attend une version plus récente que last_version et retourne (version, jpeg) la plus récente,
+        ou None si le délai expire ou si la diffusion est terminée.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.version > last_version or self.closed, timeout):
+                return None
+            if self.version > last_version:
+                return self._ring[self.version % self.ring_size]
+            return None
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def register_client(self):
+        with self._cond:
+            self._next_client_id += 1
+            client = ClientStats(self._next_client_id)
+            self._clients[client.client_id] = client
+            return client
+
+    def unregister_client(self, client):
+        with self._cond:
+            self._clients.pop(client.client_id, None)
+
+    def stats(self):
+        with self._cond:
+            clients = list(self._clients.values())
+        return {
+            "version": self.version,
+            "frames_encoded": self.frames_encoded,
+            "quality": self.quality,
+            "max_width": self.max_width,
+            "clients": [client.to_dict() for client in clients],
+        }
@@ -0,0 +1,317 @@
+# Upload par morceaux reprenable : écriture directe sur disque, empreinte calculée au fil de l'eau
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+from werkzeug.utils import secure_filename
+
+READ_SIZE = 1 << 20  # Lecture du corps de requête par blocs de 1 Mo
+MKV_HEADER_BYTES = 2 * 1024 * 1024  # Données demandées avant d'ouvrir un MKV/WebM en cours d'upload
+
+
+class UploadError(Exception):
+    """
+    Requête d'upload refusée ; status est le code HTTP à retourner.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def reserve_path(folder, name):
+    """
+    Chemin libre dans folder pour name (match.mp4, match_1.mp4...), créé vide aussitôt : le nom
+    n'est pas réutilisé par un autre upload, et un fichier en cours d'analyse n'est jamais écrasé.
+    """
+    stem, ext = os.path.splitext(name)
+    counter = 0
+    while True:
+        path = os.path.join(folder, name if not counter else f"{stem}_{counter}{ext}")
+        try:
+            open(path, 'xb').close()
+            return path
+        except FileExistsError:
+            counter += 1
+
+
+def probe_stream_header(path, available):
+    """
+    Le conteneur peut-il être décodé avant la fin de l'upload ?
+    Retourne (True, octets nécessaires pour l'ouvrir), (False, 0) si l'index n'est lu qu'en fin
+    de fichier (MP4/MOV sans "faststart", AVI...), ou (None, 0) s'il faut plus de données pour conclure.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(min(available, 12))
+        if len(head) < 12:
+            return None, 0
+        if head[:4] == b'\x1a\x45\xdf\xa3':
+            # Matroska/WebM : en-têtes en début de fichier, clusters à la suite
+            return True, MKV_HEADER_BYTES
+        if head[4:8] != b'ftyp':
+            return False, 0
+        # MP4/MOV : l'atome moov (index des échantillons) doit précéder mdat (données)
+        offset = 0
+        while offset + 8 <= available:
+            f.seek(offset)
+            size, box_type = struct.unpack(">I4s", f.read(8))
+            if size == 1:
+                if offset + 16 > available:
+                    return None, 0
+                size = struct.unpack(">Q", f.read(8))[0]
+            if box_type == b'moov':
+                return (True, offset + size) if size else (False, 0)
+            if box_type == b'mdat' or size < 8:
+                return False, 0
+            offset += size
+    return None, 0
+
+
+class UploadSession:
+    """
+    Upload en cours : les morceaux sont ajoutés à la suite dans le fichier final (aucune copie
+    ni assemblage), l'empreinte SHA-256 est mise à jour à chaque écriture.
+    Les lecteurs (décodeur d'un job démarré avant la fin) attendent les données avec wait_for().
+    """
+
+    def __init__(self, upload_id, path, filename, size, options=None, created_at=None):
+        self.id = upload_id
+        self.path = path
+        self.filename = filename
+        self.size = size
+        self.options = options or {}  # Réglages du job lancé sur cette vidéo
+        self.created_at = created_at or time.time()
+        self.updated_at = time.time()
+        self.received = os.path.getsize(path) if os.path.exists(path) else 0
+        self.complete = False
+        self.error = None  # Upload abandonné ou empreinte invalide
+        self.sha256 = None
+        self.job_id = None
+        self.streamable = None  # None : pas encore déterminé
+        self.header_size = 0
+        self._hash = None
+        self._write_lock = threading.Lock()  # Un seul morceau écrit à la fois
+        self._cond = threading.Condition()
+
+    def write(self, offset, stream):
+        """
+        Ajoute le corps d'une requête écrit à partir de offset. Les octets déjà reçus (morceau
+        renvoyé après une coupure) sont ignorés ; un trou dans le fichier est refusé.
+        Retourne le nombre d'octets reçus ; en cas de coupure, ce qui est arrivé reste acquis.
+        """
+        with self._write_lock:
+            if self.complete or self.error:
+                raise UploadError("Upload terminé", 409)
+            if offset > self.received:
+                raise UploadError(f"Décalage {offset} au-delà des {self.received} octets reçus", 409)
+            self._ensure_hash()
+            skip = self.received - offset
+            with open(self.path, 'r+b') as f:
+                f.seek(self.received)
+                for data in iter(lambda: stream.read(READ_SIZE), b''):
+                    if skip:
+                        if len(data) <= skip:
+                            skip -= len(data)
+                            continue
+                        data, skip = data[skip:], 0
+                    if self.received + len(data) > self.size:
+                        raise UploadError("Données au-delà de la taille annoncée")
+                    f.write(data)
+                    f.flush()  # Visible par le décodeur avant d'annoncer les octets
+                    self._hash.update(data)
+                    with self._cond:
+                        self.received += len(data)
+                        self.updated_at = time.time()
+                        self._cond.notify_all()
+            return self.received
+
+    def _ensure_hash(self):
+        # Après un redémarrage du serveur : empreinte des octets déjà présents sur disque
+        if self._hash is None:
+            self._hash = hashlib.sha256()
+            with open(self.path, 'rb') as f:
+                remaining = self.received
+                while remaining:
+                    data = f.read(min(READ_SIZE, remaining))
+                    if not data:
+                        break
+                    self._hash.update(data)
+                    remaining -= len(data)
+
+    def finish(self, sha256=None):
+        """
+        Termine l'upload ; sha256 (facultatif) est comparée à l'empreinte calculée côté serveur.
+        """
+        with self._write_lock:
+            if self.complete:
+                return self.sha256
+            if self.received != self.size:
+                raise UploadError(f"Upload incomplet ({self.received}/{self.size} octets)", 409)
+            self._ensure_hash()
+            digest = self._hash.hexdigest()
+            if sha256 and sha256.lower() != digest:
+                self.fail("Empreinte SHA-256 différente de celle du client")
+                raise UploadError("Empreinte SHA-256 invalide", 422)
+            with self._cond:
+                self.sha256 = digest
+                self.complete = True
+                self.updated_at = time.time()
+                self._cond.notify_all()
+            return digest
+
+    def fail(self, error):
+        with self._cond:
+            self.error = error
+            self._cond.notify_all()
+
+    def probe(self):
+        """
+        Détermine (une fois assez d'octets reçus) si la vidéo peut être lue pendant l'upload.
+        """
+        if self.streamable is None and self.received:
+            self.streamable, self.header_size = probe_stream_header(self.path, self.received)
+        return self.streamable
+
+    @property
+    def ready_for_streaming(self):
+        return bool(self.streamable) and self.received >= min(self.header_size, self.size)
+
+    def wait_for(self, nbytes, timeout=None):
+        """
+        Attend que nbytes soient sur disque (ou la fin de l'upload). Retourne True si disponibles.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.received >= nbytes or self.complete or self.error, timeout)
+            return self.received >= nbytes or self.complete
+
+    def to_dict(self):
+        return {
+            "upload_id": self.id,
+            "filename": os.path.basename(self.path),
+            "size": self.size,
+            "received": self.received,
+            "complete": self.complete,
+            "sha256": self.sha256,
+            "streamable": self.streamable,
+            "job_id": self.job_id,
+            "error": self.error,
+        }
+
+
+class UploadManager:
+    """
+    Sessions d'upload ; leur description est écrite dans <dossier>/.partial pour reprendre
+    un upload après un redémarrage du serveur (les octets reçus sont ceux présents sur disque).
+    on_remove(path) est appelé quand le fichier d'un upload inachevé est supprimé.
+    """
+
+    def __init__(self, folder, max_size, session_ttl=24 * 3600, on_remove=None):
+        self.folder = folder
+        self.meta_folder = os.path.join(folder, ".partial")
+        self.max_size = max_size
+        self.session_ttl = session_ttl
+        self.on_remove = on_remove
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.isdir(self.meta_folder):
+            return
+        for name in os.listdir(self.meta_folder):
+            meta_path = os.path.join(self.meta_folder, name)
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not os.path.exists(meta["path"]):
+                os.remove(meta_path)
+                continue
+            self.sessions[meta["id"]] = UploadSession(meta["id"], meta["path"], meta["filename"], meta["size"],
+                                                      meta.get("options"), meta.get("created_at"))
+
+    def create(self, filename, size, options=None):
+        name = secure_filename(filename or "")
+        if not name:
+            raise UploadError("Nom de fichier invalide")
+        if size <= 0 or size > self.max_size:
+            raise UploadError(f"Taille invalide (max {self.max_size // 1024 ** 2} Mo)", 413)
+        self.expire()
+        os.makedirs(self.meta_folder, exist_ok=True)
+        with self._lock:
+            path = reserve_path(self.folder, name)
+            session = UploadSession(uuid.uuid4().hex, path, filename, size, options)
+            self.sessions[session.id] = session
+        self._write_meta(session)
+        return session
+
+    def _meta_path(self, upload_id):
+        return os.path.join(self.meta_folder, f"{upload_id}.json")
+
+    def _write_meta(self, session):
+        meta = {"id": session.id, "path": session.path, "filename": session.filename, "size": session.size,
+                "options": session.options, "created_at": session.created_at}
+        tmp_path = self._meta_path(session.id) + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(session.id))
+
+    def get(self, upload_id):
+        with self._lock:
+            return self.sessions.get(upload_id)
+
+    def finish(self, session, sha256=None):
+        digest = session.finish(sha256)
+        try:
+            os.remove(self._meta_path(session.id))
+        except FileNotFoundError:
+            pass
+        return digest
+
+    def find(self, path):
+        """
+        Session encore en cours pour ce fichier (None si le fichier est complet).
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            for session in self.sessions.values():
+                if not session.complete and os.path.abspath(session.path) == path:
+                    return session
+        return None
+
+    def is_partial(self, path):
+        return self.find(path) is not None
+
+    def partial_paths(self):
+        with self._lock:
+            return {session.path for session in self.sessions.values() if not session.complete}
+
+    def remove(self, upload_id, delete_file=True):
+        with self._lock:
+            session = self.sessions.pop(upload_id, None)
+        if session is None:
+            return
+        if not session.complete:
+            session.fail("Upload annulé")
+            if delete_file and os.path.exists(session.path):
+                os.remove(session.path)
+                if self.on_remove is not None:
+                    self.on_remove(session.path)
+        try:
+            os.remove(self._meta_path(upload_id))
+        except FileNotFoundError:
+            pass
+
+    def expire(self):
+        """
+        Oublie les sessions inactives depuis plus de session_ttl (fichier supprimé si l'upload est inachevé).
+        """
+        now = time.time()
+        with self._lock:
+            expired = [session for session in self.sessions.values() if now - session.updated_at > self.session_ttl]
+        for session in expired:
+            self.remove(session.id, delete_file=not session.complete)
@@ -0,0 +1,253 @@
+# Étape de décodage : buffers préalloués, redimensionnement au décodage et positionnement dans la vidéo
+import threading
+import time
+import cv2
+import numpy as np
+
+
+class FramePool:
+    """
+    Ensemble fixe de buffers de frames réutilisés (aucune allocation par frame).
+    acquire() bloque quand tous les buffers sont en cours d'utilisation : la taille du pool
+    borne la mémoire et freine le décodage quand l'aval est en retard.
+    """
+
+    def __init__(self, count, shape):
+        self.count = count
+        self.shape = shape
+        self._free = [np.empty(shape, dtype=np.uint8) for _ in range(count)]
+        self._cond = threading.Condition()
+        self._closed = False
+        self.max_in_use = 0
+        self.waits = 0  # Nombre de fois où le décodage a attendu un buffer libre
+
+    @property
+    def in_use(self):
+        return self.count - len(self._free)
+
+    def acquire(self):
+        """
+        Buffer libre, ou None si le pool est fermé.
+        """
+        with self._cond:
+            if not self._free and not self._closed:
+                self.waits += 1
+                self._cond.wait_for(lambda: self._free or self._closed)
+            if self._closed:
+                return None
+            buffer = self._free.pop()
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            return buffer
+
+    def release(self, buffer):
+        """
+        Rend un buffer acquis. Un tableau d'une autre forme (le backend a alloué sa propre frame)
+        est remplacé par un buffer neuf : le pool garde toujours count buffers.
+        """
+        if buffer.shape != self.shape or buffer.dtype != np.uint8:
+            buffer = np.empty(self.shape, dtype=np.uint8)
+        with self._cond:
+            if len(self._free) < self.count:
+                self._free.append(buffer)
+                self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "buffers": self.count,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "utilisation": round(self.in_use / self.count, 2),
+                "waits": self.waits,
+                "buffer_mb": round(self.count * int(np.prod(self.shape)) / 1024 / 1024, 1),
+            }
+
+
+class VideoDecoder:
+    """
+    Décode une vidéo dans les buffers d'un FramePool.
+    - max_width : frames réduites dès le décodage (toute la suite du pipeline travaille à cette taille) ;
+    - start_frame / start_time : début de l'analyse ailleurs qu'au début de la vidéo ;
+    - hw_accel : décodage matériel demandé à OpenCV si le backend le permet ;
+    - growing : fichier en cours d'upload (UploadSession), lu au fur et à mesure de son arrivée.
+    Les frames retournées appartiennent au pool : les rendre avec release() une fois utilisées.
+    """
+
+    def __init__(self, video_path, buffer_count=32, max_width=None, hw_accel=False, growing=None,
+                 growth_margin=4 * 1024 * 1024):
+        self.video_path = video_path
+        self.buffer_count = buffer_count
+        self.max_width = max_width
+        self.hw_accel = hw_accel
+        self.growing = growing
+        self.growth_margin = growth_margin  # Avance minimale de l'upload sur la position décodée (octets)
+        self.growth_waits = 0  # Nombre d'attentes de données de l'upload
+        self.error = None  # Upload interrompu avant la fin de la vidéo
+        self._interrupted = threading.Event()
+        self._reopened_complete = False
+        self.cap = None
+        self.pool = None
+        self.fps = 0
+        self.total_frames = 0
+        self.source_size = (0, 0)  # (largeur, hauteur) de la vidéo
+        self.frame_size = (0, 0)  # (largeur, hauteur) des frames décodées
+        self.position = 0  # Index de la prochaine frame
+        self.frames_decoded = 0
+        self.decode_time = 0.0
+        self._scratch = None
+
+    def open(self):
+        if self.growing is not None:
+            if self.growing.complete:
+                self.growing = None
+            elif not self._wait_bytes(min(self.growing.header_size, self.growing.size)):
+                return False
+        self.cap = self._open_capture()
+        if not self.cap.isOpened():
+            self.cap.release()
+            return False
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.source_size = (width, height)
+        if self.max_width and width > self.max_width:
+            self.frame_size = (self.max_width, int(round(height * self.max_width / width)))
+            self._scratch = np.empty((height, width, 3), dtype=np.uint8)
+        else:
+            self.frame_size = (width, height)
+        self.pool = FramePool(self.buffer_count, (self.frame_size[1], self.frame_size[0], 3))
+        return True
+
+    def _open_capture(self):
+        if self.hw_accel and hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+            cap = cv2.VideoCapture(self.video_path, cv2.CAP_ANY,
+                                   [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+            if cap.isOpened():
+                return cap
+            print("Décodage matériel indisponible, retour au décodage logiciel")
+        return cv2.VideoCapture(self.video_path)
+
+    @property
+    def resized(self):
+        return self._scratch is not None
+
+    def seek(self, frame=None, time_s=None):
+        """
+        Positionne le décodage sur une frame ou un instant (secondes) ; retourne l'index de frame atteint.
+        """
+        if time_s is not None:
+            self.cap.set(cv2.CAP_PROP_POS_MSEC, time_s * 1000)
+        elif frame:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+        self.position = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        return self.position
+
+    def read(self):
+        """
+        (index, frame) de la frame suivante, ou None en fin de vidéo / pool fermé.
+        """
+        buffer = self.pool.acquire()
+        if buffer is None:
+            return None
+        if self.growing is not None and not self._wait_bytes(self._bytes_needed(self.position)):
+            self.pool.release(buffer)
+            return None
+        start = time.perf_counter()
+        ret, buffer = self._read_into(buffer)
+        while not ret and self._wait_for_growth():
+            ret, buffer = self._read_into(buffer)
+        if not ret:
+            self.pool.release(buffer)
+            return None
+        self.decode_time += time.perf_counter() - start
+        self.frames_decoded += 1
+        index = self.position
+        self.position += 1
+        return index, buffer
+
+    def _read_into(self, buffer):
+        if self._scratch is not None:
+            ret, _ = self.cap.read(self._scratch)
+            if ret:
+                cv2.resize(self._scratch, self.frame_size, dst=buffer, interpolation=cv2.INTER_AREA)
+        else:
+            ret, frame = self.cap.read(buffer)
+            if ret and frame is not buffer:
+                # Le backend n'a pas réutilisé le buffer (format inattendu) : on s'y ramène
+                buffer = frame
+        return ret, buffer
+
+    def _bytes_needed(self, frame_index):
+        """
+        Octets à recevoir avant de décoder une frame d'un fichier en cours d'upload : position
+        proportionnelle dans les données (débit supposé à peu près constant) plus une marge.
+        """
+        size = self.growing.size
+        if not self.total_frames:
+            return min(size, self.growing.header_size + self.growth_margin)
+        header = self.growing.header_size
+        return min(size, int(header + (size - header) * (frame_index + 1) / self.total_frames) + self.growth_margin)
+
+    def _wait_bytes(self, nbytes):
+        if self.growing.received < nbytes and not self.growing.complete:
+            self.growth_waits += 1
+        while not self._interrupted.is_set():
+            if self.growing.wait_for(nbytes, timeout=0.5):
+                return True
+            if self.growing.error:
+                self.error = self.growing.error
+                return False
+        return False
+
+    def _wait_for_growth(self):
+        """
+        Lecture échouée sur un fichier en cours d'upload (fin des données atteinte) : attend la suite,
+        puis rouvre la vidéo à la même position (le démultiplexeur ne relit pas après une fin de fichier).
+        """
+        if self.growing is None or self._reopened_complete:
+            return False
+        if self.growing.complete:
+            self._reopened_complete = True  # Dernière tentative, sur le fichier complet
+        elif not self._wait_bytes(self.growing.received + self.growth_margin):
+            return False
+        self.cap.release()
+        self.cap = self._open_capture()
+        if not self.cap.isOpened():
+            return False
+        if self.position:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.position)
+        return True
+
+    def release(self, frame):
+        self.pool.release(frame)
+
+    def interrupt(self):
+        """
+        Réveille un read() bloqué en attente d'un buffer (arrêt depuis un autre thread).
+        """
+        self._interrupted.set()
+        if self.pool is not None:
+            self.pool.close()
+
+    def close(self):
+        self.interrupt()
+        if self.cap is not None:
+            self.cap.release()
+
+    def stats(self):
+        return {
+            "frames_decoded": self.frames_decoded,
+            "decode_fps": round(self.frames_decoded / self.decode_time, 1) if self.decode_time else None,
+            "source_size": list(self.source_size),
+            "frame_size": list(self.frame_size),
+            "hw_accel": self.hw_accel,
+            "position": self.position,
+            "growth_waits": self.growth_waits,
+            "pool": self.pool.stats() if self.pool is not None else None,
+        }
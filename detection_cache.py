@@ -0,0 +1,305 @@
+# Cache disque des détections/suivis, indexé par le contenu de la vidéo et les paramètres d'inférence
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from track_store import TrackStore, ROW_WIDTH
+
+# Chaque chunk est un tableau (n, ROW_WIDTH) float32 au format TrackStore.to_rows(), trié par frame
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    Empreinte SHA-256 du contenu d'un fichier (vidéo ou poids du modèle).
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class CacheEntry:
+    """
+    Résultats (éventuellement partiels) d'une analyse : frames [0, frames_done) disponibles.
+    Les chunks sont ouverts en mémoire projetée et parcourus par plage de frames.
+    """
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self._chunks = [(chunk["start"], chunk["end"], np.load(os.path.join(path, chunk["file"]), mmap_mode='r'))
+                        for chunk in meta["chunks"]]
+
+    @property
+    def frames_done(self):
+        return self.meta["frames_done"]
+
+    @property
+    def complete(self):
+        return self.meta["complete"]
+
+    @property
+    def max_track_id(self):
+        """
+        Plus grand identifiant de track écrit : une analyse reprise numérote ses tracks au-delà.
+        """
+        if "max_track_id" in self.meta:
+            return self.meta["max_track_id"]
+        # Entrée écrite avant l'enregistrement de cette valeur
+        return max((int(rows[:, 2].max()) for _, _, rows in self._chunks if len(rows)), default=0)
+
+    def tracks(self, frame_start, frame_end):
+        """
+        Suivis au format dictionnaire historique pour [frame_start, frame_end).
+        """
+        return self.store(frame_start, frame_end).to_dict(frame_start, frame_end)
+
+    def store(self, frame_start, frame_end):
+        frame_end = min(frame_end, self.frames_done)
+        selected = []
+        for start, end, rows in self._chunks:
+            if end <= frame_start or start >= frame_end:
+                continue
+            # Les lignes sont triées par frame : recherche dichotomique de la plage
+            lo = np.searchsorted(rows[:, 0], frame_start, side='left')
+            hi = np.searchsorted(rows[:, 0], frame_end, side='left')
+            selected.append(rows[lo:hi])
+        rows = np.concatenate(selected) if selected else np.empty((0, ROW_WIDTH), dtype=np.float32)
+        return TrackStore.from_rows(rows)
+
+
+class CacheWriter:
+    """
+    Ajoute les résultats lot par lot ; un chunk est écrit sur disque toutes les chunk_frames
+    frames, puis les métadonnées sont remplacées atomiquement (point de reprise).
+    """
+
+    def __init__(self, cache, key, path, meta, chunk_frames=250):
+        self.cache = cache
+        self.key = key
+        self.path = path
+        self.meta = meta
+        self.chunk_frames = chunk_frames
+        self._pending = []
+        self._pending_start = meta["frames_done"]
+        self._pending_end = meta["frames_done"]
+
+    def append(self, store, frame_start, frame_end):
+        """
+        Ajoute les suivis (TrackStore) des frames [frame_start, frame_end).
+        """
+        if frame_start != self._pending_end:
+            raise ValueError(f"Lot non contigu : {frame_start} (attendu {self._pending_end})")
+        self._pending.append(store.select(store.frame_rows(frame_start, frame_end)).to_rows())
+        self._pending_end = frame_end
+        if self._pending_end - self._pending_start >= self.chunk_frames:
+            self.flush()
+
+    def flush(self, complete=False):
+        if self._pending_end > self._pending_start:
+            rows = np.concatenate(self._pending)
+            rows = rows[np.argsort(rows[:, 0], kind='stable')]
+            filename = f"chunk_{self._pending_start:08d}.npy"
+            np.save(os.path.join(self.path, filename), rows)
+            if len(rows):
+                self.meta["max_track_id"] = max(self.meta.get("max_track_id", 0), int(rows[:, 2].max()))
+            self.meta["chunks"].append({"file": filename, "start": self._pending_start, "end": self._pending_end})
+            self.meta["frames_done"] = self._pending_end
+            self._pending = []
+            self._pending_start = self._pending_end
+        if complete:
+            self.meta["complete"] = True
+        self.cache._write_meta(self.key, self.path, self.meta)
+
+    def close(self, complete=False, release=True):
+        """
+        Écrit les derniers résultats ; release=False garde l'entrée réservée (libérée ensuite par
+        DetectionCache.release(key, writer=True)).
+        """
+        self.flush(complete)
+        if release:
+            self.cache.release(self.key, writer=True)
+
+    def entry(self):
+        """
+        Entrée en lecture sur les résultats déjà écrits.
+        """
+        return CacheEntry(self.path, self.meta)
+
+
+class DetectionCache:
+    """
+    Cache disque des suivis par frame, clé = (hash vidéo, hash des poids, conf, imgsz).
+    Taille totale bornée : les entrées les moins récemment utilisées sont supprimées.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = {}  # key -> {"bytes": int, "last_access": float, "video_hash": str}
+        self._pinned = {}  # key -> nombre d'utilisateurs
+        self._writers = set()  # Clés en cours d'écriture (un seul writer par clé)
+        self._hashes = {}  # (path, taille, mtime) -> hash
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            return sum(item["bytes"] for item in self._index.values())
+
+    def content_hash(self, path):
+        stat = os.stat(path)
+        hash_key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+        with self._lock:
+            cached = self._hashes.get(hash_key)
+        if cached is None:
+            cached = file_hash(path)
+            with self._lock:
+                self._hashes[hash_key] = cached
+        return cached
+
+    def known_hash(self, path):
+        """
+        Empreinte déjà calculée pour ce fichier inchangé, sans le relire (None sinon).
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            return self._hashes.get((os.path.abspath(path), stat.st_size, stat.st_mtime))
+
+    def remember_hash(self, path, digest):
+        """
+        Empreinte déjà connue (calculée pendant l'upload) : évite de relire le fichier.
+        """
+        stat = os.stat(path)
+        with self._lock:
+            self._hashes[(os.path.abspath(path), stat.st_size, stat.st_mtime)] = digest
+
+    def make_key(self, video_path, model_path, conf, imgsz, **settings):
+        """
+        Les réglages supplémentaires (ex. pas de détection) qui modifient les résultats
+        entrent dans la clé ; ceux à None sont ignorés.
+        """
+        video_hash = self.content_hash(video_path)
+        weights_hash = self.content_hash(model_path)
+        settings = {name: value for name, value in sorted(settings.items()) if value is not None}
+        key_source = f"{video_hash}:{weights_hash}:{conf}:{imgsz}"
+        if settings:
+            key_source += ":" + json.dumps(settings, sort_keys=True)
+        key = hashlib.sha256(key_source.encode()).hexdigest()[:32]
+        params = dict(settings, video_hash=video_hash, weights_hash=weights_hash, conf=conf, imgsz=imgsz)
+        return key, params
+
+    def open(self, key, params):
+        """
+        Retourne (entrée existante ou None, writer pour compléter l'analyse ou None si complète
+        ou déjà en cours d'écriture par un autre job). L'entrée est protégée de l'éviction jusqu'à release().
+        """
+        path = os.path.join(self.root, key)
+        with self._lock:
+            self._pinned[key] = self._pinned.get(key, 0) + 1
+            can_write = key not in self._writers
+            if can_write:
+                self._writers.add(key)
+        meta = self._read_meta(path)
+        if meta is None:
+            os.makedirs(path, exist_ok=True)
+            meta = dict(params, frames_done=0, complete=False, chunks=[])
+            entry = None
+        else:
+            os.utime(os.path.join(path, "meta.json"))  # Date d'accès conservée après redémarrage
+            entry = CacheEntry(path, meta)
+        self._touch(key, path, meta)
+        if meta["complete"] or not can_write:
+            with self._lock:
+                if can_write:
+                    self._writers.discard(key)
+            return entry, None
+        return entry, CacheWriter(self, key, path, meta)
+
+    def release(self, key, writer=False):
+        with self._lock:
+            if writer:
+                self._writers.discard(key)
+            count = self._pinned.get(key, 0) - 1
+            if count <= 0:
+                self._pinned.pop(key, None)
+            else:
+                self._pinned[key] = count
+        self.evict()
+
+    def remove_video(self, video_hash):
+        """
+        Supprime toutes les analyses d'une vidéo (hors entrées en cours d'utilisation).
+        """
+        with self._lock:
+            keys = [key for key, item in self._index.items()
+                    if item["video_hash"] == video_hash and key not in self._pinned]
+        for key in keys:
+            self._remove(key)
+
+    def evict(self):
+        while True:
+            with self._lock:
+                total = sum(item["bytes"] for item in self._index.values())
+                candidates = [(item["last_access"], key) for key, item in self._index.items()
+                              if key not in self._pinned]
+            if total <= self.max_bytes or not candidates:
+                return
+            _, key = min(candidates)
+            print(f"Cache : éviction de {key}")
+            self._remove(key)
+
+    def _remove(self, key):
+        shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+        with self._lock:
+            self._index.pop(key, None)
+
+    def _touch(self, key, path, meta):
+        with self._lock:
+            self._index[key] = {"bytes": self._entry_size(path), "last_access": time.time(),
+                                "video_hash": meta["video_hash"]}
+
+    def _write_meta(self, key, path, meta):
+        tmp_path = os.path.join(path, "meta.json.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(path, "meta.json"))
+        self._touch(key, path, meta)
+        self.evict()
+
+    @staticmethod
+    def _read_meta(path):
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _entry_size(path):
+        try:
+            return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+        except OSError:
+            return 0
+
+    def _load_index(self):
+        # Parcours unique au démarrage ; l'index est ensuite tenu à jour en mémoire
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            meta = self._read_meta(entry.path)
+            if meta is None:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            self._index[entry.name] = {"bytes": self._entry_size(entry.path),
+                                       "last_access": os.path.getmtime(os.path.join(entry.path, "meta.json")),
+                                       "video_hash": meta["video_hash"]}
@@ -0,0 +1,119 @@
+# Export en continu des frames annotées vers un fichier vidéo
+import os
+import threading
+import time
+import cv2
+from pipeline import ClosableQueue, QueueClosed
+
+
+class VideoExporter:
+    """
+    Encode les frames annotées dans une vidéo de sortie au fur et à mesure.
+    Les frames transitent par une file bornée : la mémoire reste constante
+    quelle que soit la durée de la vidéo (le producteur attend si l'encodeur est en retard).
+    """
+
+    def __init__(self, output_path, fps, frame_size, codec="mp4v", max_queue_size=30, latency=None):
+        self.output_path = output_path
+        self.fps = fps if fps and fps > 0 else 25.0
+        self.frame_size = frame_size  # (largeur, hauteur)
+        self.codec = codec
+        self.frame_queue = ClosableQueue(maxsize=max_queue_size)
+        self.frames_written = 0
+        self.latency = latency  # LatencyTracker facultatif (étape video_encode)
+        self.error = None
+        self.finished = False
+        self._writer = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_worker, daemon=True)
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        self._writer = cv2.VideoWriter(
+            self.output_path,
+            cv2.VideoWriter_fourcc(*self.codec),
+            self.fps,
+            self.frame_size
+        )
+        if not self._writer.isOpened():
+            self.error = f"Impossible d'ouvrir {self.output_path} en écriture"
+            self.finished = True
+            return False
+        self._thread.start()
+        return True
+
+    def write(self, frame, on_written=None):
+        """
+        Ajoute une frame à encoder. Bloque si la file est pleine (back-pressure).
+        La frame ne doit plus être modifiée par l'appelant après cet appel ;
+        on_written(frame) est appelé une fois la frame encodée (ex. rendre un buffer au décodeur).
+        """
+        try:
+            self.frame_queue.put((frame, on_written))
+            return True
+        except QueueClosed:
+            return False
+
+    def close(self, wait=True):
+        """
+        Signale la fin du flux ; l'encodeur vide la file puis ferme le fichier.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.frame_queue.close()
+        if self._thread.is_alive():
+            if wait:
+                self._thread.join()
+        elif self._writer is not None:
+            self._writer.release()
+            self.finished = True
+
+    def abort(self):
+        """
+        Interrompt l'export : les frames en attente sont abandonnées et le fichier partiel supprimé.
+        """
+        self._closed = True
+        self.error = self.error or "Export interrompu"  # Fichier supprimé : le job n'est pas terminé
+        self.frame_queue.cancel()
+        if self._thread.is_alive():
+            self._thread.join()
+        if os.path.exists(self.output_path):
+            try:
+                os.remove(self.output_path)
+            except OSError as e:
+                print(f"Erreur suppression export partiel: {e}")
+
+    @property
+    def thread(self):
+        return self._thread
+
+    @property
+    def is_saving(self):
+        return self._closed and not self.finished
+
+    def _write_worker(self):
+        width, height = self.frame_size
+        try:
+            while True:
+                try:
+                    frame, on_written = self.frame_queue.get()
+                except QueueClosed:
+                    break
+                output = frame
+                if frame.shape[1] != width or frame.shape[0] != height:
+                    output = cv2.resize(frame, (width, height))
+                start = time.perf_counter()
+                self._writer.write(output)
+                if self.latency is not None:
+                    self.latency.record("video_encode", time.perf_counter() - start)
+                self.frames_written += 1
+                if on_written is not None:
+                    on_written(frame)
+        except Exception as e:
+            self.error = str(e)
+            print(f"Erreur lors de l'export vidéo: {e}")
+            self.frame_queue.cancel()  # Débloque le producteur
+        finally:
+            self._writer.release()
+            self.finished = True
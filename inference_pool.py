@@ -0,0 +1,255 @@
+# Pool de processus d'inférence : contourne le GIL en répartissant les frames sur plusieurs cœurs
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+import supervision as sv
+
+
+class PoolResult:
+    """
+    Résultat d'inférence renvoyé par un worker : détections au format supervision et noms de classes.
+    Remplace le Results d'ultralytics dans Tracker (voir Tracker._store_from_detections).
+    """
+
+    def __init__(self, names, xyxy, confidence, class_id):
+        self.names = names
+        self.sv_detections = sv.Detections(xyxy=xyxy.reshape(-1, 4).astype(np.float32),
+                                           confidence=confidence.astype(np.float32),
+                                           class_id=class_id.astype(int))
+
+
+def to_supervision(result):
+    """
+    Détections supervision d'un résultat d'inférence (Results d'ultralytics ou PoolResult).
+    """
+    detections = getattr(result, "sv_detections", None)
+    if detections is None:
+        detections = sv.Detections.from_ultralytics(result)
+    return detections
+
+
+def _worker_main(model_path, device, threads, task_queue, result_queue):
+    """
+    Boucle d'un worker : charge le modèle une fois, puis traite les frames lues en mémoire partagée.
+    """
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    from model_registry import get_model
+    model = get_model(model_path, device)
+    result_queue.put(("ready", model.names))
+
+    # Segments ouverts par nom ; ils appartiennent au parent, qui seul les supprime
+    # (les workers "spawn" partagent son resource_tracker)
+    segments = {}
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, shm_name, shape, conf, imgsz = task
+        try:
+            shm = segments.get(shm_name)
+            if shm is None:
+                shm = segments[shm_name] = shared_memory.SharedMemory(name=shm_name)
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            boxes = model.predict([frame], conf=conf, imgsz=imgsz)[0].boxes
+            result_queue.put((task_id, boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(),
+                              boxes.cls.cpu().numpy(), None))
+        except Exception as e:
+            result_queue.put((task_id, None, None, None, repr(e)))
+    for shm in segments.values():
+        shm.close()
+
+
+class _Slot:
+    def __init__(self, size):
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+    def release(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class InferencePool:
+    """
+    N processus d'inférence, chacun avec son propre modèle chargé une seule fois.
+    Les frames sont copiées dans des segments de mémoire partagée préalloués (pas de pickling
+    des images) ; seules les boîtes reviennent par la file de résultats.
+    S'utilise comme un modèle : predict(frames) retourne les résultats dans l'ordre des frames,
+    prêts pour la mise à jour ByteTrack.
+    Un worker arrêté (OOM, plantage du backend) ou une frame sans réponse après task_timeout
+    secondes rendent le pool inutilisable : les appels en attente et suivants lèvent RuntimeError,
+    pour que les jobs échouent au lieu de rester bloqués.
+    """
+
+    def __init__(self, model_path, workers=2, device='cpu', slots=None, threads_per_worker=None,
+                 task_timeout=120.0, poll_interval=0.5):
+        self.model_path = model_path
+        self.workers = workers
+        self.task_timeout = task_timeout
+        self.poll_interval = poll_interval  # Intervalle de vérification des workers pendant les attentes
+        self.error = None  # Raison de l'arrêt du pool
+        self._lock = threading.Lock()
+        self._closed = False
+        ctx = mp.get_context("spawn")
+        self._task_queue = ctx.Queue()
+        self._result_queue = ctx.Queue()
+        if threads_per_worker is None:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+
+        self._processes = [ctx.Process(target=_worker_main, daemon=True,
+                                       args=(model_path, device, threads_per_worker,
+                                             self._task_queue, self._result_queue))
+                           for _ in range(workers)]
+        for process in self._processes:
+            process.start()
+
+        # Chaque worker signale qu'il a chargé le modèle
+        self.names = None
+        ready = 0
+        while ready < workers:
+            try:
+                _, self.names = self._result_queue.get(timeout=poll_interval)
+                ready += 1
+            except queue.Empty:
+                self._check_workers()
+                if self.error is not None:
+                    # Worker mort au chargement du modèle : les autres sont arrêtés
+                    for process in self._processes:
+                        process.terminate()
+                    raise RuntimeError(self.error)
+
+        # Segments de mémoire partagée : au plus `slots` frames en vol
+        self._slot_count = slots or 2 * workers
+        self._slots = [None] * self._slot_count
+        self._free_slots = queue.Queue()
+        for slot_index in range(self._slot_count):
+            self._free_slots.put(slot_index)
+
+        self._pending = {}  # task_id -> [event, résultat, index du slot]
+        self._task_ids = itertools.count()
+        self._collector = threading.Thread(target=self._collect_results, daemon=True)
+        self._collector.start()
+
+    def predict(self, frames, conf=0.25, imgsz=640, **kwargs):
+        """
+        Répartit les frames sur les workers et retourne les PoolResult dans l'ordre d'entrée.
+        """
+        tasks = [self._submit(frame, conf, imgsz) for frame in frames]
+        results = []
+        for task_id in tasks:
+            results.append(self._wait(task_id))
+        return results
+
+    def _submit(self, frame, conf, imgsz):
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        while True:
+            self._raise_if_broken()
+            try:
+                # Attend si toutes les frames en vol occupent les slots
+                slot_index = self._free_slots.get(timeout=self.poll_interval)
+                break
+            except queue.Empty:
+                self._check_workers()
+        slot = self._slots[slot_index]
+        if slot is None or slot.shm.size < frame.nbytes:
+            if slot is not None:
+                slot.release()
+            slot = self._slots[slot_index] = _Slot(frame.nbytes)
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=slot.shm.buf)[...] = frame
+
+        task_id = next(self._task_ids)
+        with self._lock:
+            self._pending[task_id] = [threading.Event(), None, slot_index]
+        self._task_queue.put((task_id, slot.shm.name, frame.shape, conf, imgsz))
+        return task_id
+
+    def _wait(self, task_id):
+        with self._lock:
+            pending = self._pending[task_id]
+        deadline = time.monotonic() + self.task_timeout
+        while not pending[0].wait(self.poll_interval):
+            self._check_workers()
+            if self.error is None and time.monotonic() > deadline:
+                self._fail(f"Pas de réponse du pool d'inférence après {self.task_timeout:.0f}s")
+            if self.error is not None:
+                with self._lock:
+                    self._pending.pop(task_id, None)
+                raise RuntimeError(self.error)
+        with self._lock:
+            del self._pending[task_id]
+        result = pending[1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _check_workers(self):
+        for process in self._processes:
+            if not process.is_alive() and not self._closed:
+                self._fail(f"Worker d'inférence {process.pid} arrêté (code {process.exitcode})")
+                return
+
+    def _fail(self, error):
+        with self._lock:
+            if self.error is not None:
+                return
+            self.error = error
+        print(f"Pool d'inférence hors service : {error}")
+
+    def _raise_if_broken(self):
+        if self.error is not None:
+            raise RuntimeError(self.error)
+
+    def _collect_results(self):
+        while True:
+            message = self._result_queue.get()
+            if message is None:
+                break
+            task_id, xyxy, confidence, class_id, error = message
+            with self._lock:
+                pending = self._pending.get(task_id)
+            if pending is None:
+                continue
+            if error is not None:
+                pending[1] = RuntimeError(f"Erreur du worker d'inférence : {error}")
+            else:
+                pending[1] = PoolResult(self.names, xyxy, confidence, class_id)
+            # Le slot redevient disponible dès que le worker a lu la frame
+            self._free_slots.put(pending[2])
+            pending[0].set()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._processes:
+            self._task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._result_queue.put(None)
+        self._collector.join(timeout=5)
+        for slot in self._slots:
+            if slot is not None:
+                slot.release()
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "alive": sum(process.is_alive() for process in self._processes),
+            "error": self.error,
+            "slots": self._slot_count,
+            "free_slots": self._free_slots.qsize(),
+        }
@@ -0,0 +1,178 @@
+# Gestion de plusieurs traitements vidéo simultanés
+import threading
+import time
+import uuid
+from collections import deque, OrderedDict
+
+
+class Job:
+    """
+    Un traitement vidéo : identifiant, état et pipeline associé (créé au démarrage).
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+    def __init__(self, video_path, options=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.video_path = video_path
+        self.options = options or {}  # Réglages propres au job, transmis au pipeline
+        self.state = Job.PENDING
+        self.processor = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.started = threading.Event()  # Pipeline créé (ou job terminé sans démarrer)
+        self._done = threading.Event()
+
+    @property
+    def is_finished(self):
+        return self.state in (Job.COMPLETED, Job.CANCELLED, Job.FAILED)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "video": self.video_path,
+            "options": self.options,
+            "state": self.state,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Exécute plusieurs vidéos en parallèle, chacune avec son propre pipeline
+    (lecture, détection, flux). Au-delà de max_concurrent, les jobs attendent
+    dans une file FIFO et démarrent dès qu'une place se libère.
+    """
+
+    def __init__(self, processor_factory, max_concurrent=2, max_history=50):
+        self.processor_factory = processor_factory
+        self.max_concurrent = max_concurrent
+        self.max_history = max_history
+        self.jobs = OrderedDict()
+        self.pending = deque()
+        self.running = set()
+        self._lock = threading.RLock()
+
+    def submit(self, video_path, **options):
+        job = Job(video_path, options)
+        with self._lock:
+            self.jobs[job.id] = job
+            self.pending.append(job.id)
+            self._prune_history()
+        self._start_pending()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._lock:
+            return list(self.jobs.values())
+
+    def queue_position(self, job_id):
+        with self._lock:
+            try:
+                return self.pending.index(job_id) + 1
+            except ValueError:
+                return 0
+
+    def cancel(self, job_id):
+        """
+        Annule un job en attente (retiré de la file) ou en cours (pipeline arrêté).
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.is_finished:
+                return False
+            if job.state == Job.PENDING:
+                self.pending.remove(job_id)
+                self._finish(job, Job.CANCELLED)
+                return True
+            processor = job.processor
+            job.state = Job.CANCELLED
+        # Arrêt hors verrou : le callback de fin reprend le verrou.
+        # Si le pipeline est encore en cours de création, _start_pending l'arrêtera.
+        if processor is not None:
+            processor.stop()
+        return True
+
+    def join(self, job_id, timeout=None):
+        """
+        Attend la fin d'un job et de tous ses threads. Retourne False si le délai expire.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return True
+        if not job._done.wait(timeout):
+            return False
+        if job.processor is not None:
+            return job.processor.join(timeout)
+        return True
+
+    def shutdown(self, timeout=5.0):
+        with self._lock:
+            job_ids = list(self.pending) + list(self.running)
+        for job_id in job_ids:
+            self.cancel(job_id)
+        for job_id in job_ids:
+            self.join(job_id, timeout)
+
+    def _start_pending(self):
+        while True:
+            with self._lock:
+                if len(self.running) >= self.max_concurrent or not self.pending:
+                    return
+                job = self.jobs[self.pending.popleft()]
+                job.state = Job.RUNNING
+                job.started_at = time.time()
+                self.running.add(job.id)
+            try:
+                job.processor = self.processor_factory(job.id, **job.options)
+                job.processor.on_finished = lambda processor, job=job: self._on_processor_finished(job, processor)
+                if not job.processor.set_video(job.video_path):
+                    job.processor.stop()
+                    raise RuntimeError(f"Impossible d'ouvrir {job.video_path}")
+                if job.state == Job.CANCELLED:
+                    job.processor.stop()
+                job.started.set()
+            except Exception as e:
+                print(f"Erreur au démarrage du job {job.id}: {e}")
+                with self._lock:
+                    job.error = str(e)
+                    self._finish(job, Job.FAILED)
+
+    def _on_processor_finished(self, job, processor):
+        with self._lock:
+            if job._done.is_set():
+                return
+            if job.state == Job.CANCELLED:
+                self._finish(job, Job.CANCELLED)
+            elif processor.is_completed:
+                self._finish(job, Job.COMPLETED)
+            else:
+                job.error = job.error or getattr(processor, "error", None) or "Traitement interrompu"
+                self._finish(job, Job.FAILED)
+        self._start_pending()
+
+    def _finish(self, job, state):
+        job.state = state
+        job.finished_at = time.time()
+        self.running.discard(job.id)
+        job.started.set()
+        job._done.set()
+
+    def _prune_history(self):
+        # Oublie les jobs terminés les plus anciens au-delà de max_history
+        finished = [job_id for job_id, job in self.jobs.items() if job.is_finished]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_history)]:
+            del self.jobs[job_id]
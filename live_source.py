@@ -0,0 +1,274 @@
+# Sources en direct (webcam, flux RTSP/HTTP, tube nommé) et budget de latence
+import os
+import stat
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+import cv2
+import numpy as np
+import metrics
+from decoder import FramePool
+
+STREAM_SCHEMES = ("rtsp://", "rtsps://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+
+def parse_live_source(source, allowed=None):
+    """
+    Source en direct au format de cv2.VideoCapture : index de webcam, URL de flux ou tube nommé
+    (FIFO) local. Tout autre chemin est refusé (ValueError) : les fichiers passent par l'upload.
+    allowed : sources autorisées (voir is_allowed) ; None : pas de contrôle (source déjà validée par /live).
+    """
+    source = str(source).strip()
+    if allowed is not None and not is_allowed(source, allowed):
+        raise ValueError(f"Source en direct non autorisée : {source}")
+    if source.isdigit():
+        return int(source)
+    if source.lower().startswith(STREAM_SCHEMES):
+        return source
+    try:
+        if stat.S_ISFIFO(os.stat(source).st_mode):
+            return source
+    except OSError:
+        pass
+    raise ValueError(f"Source en direct invalide : {source}")
+
+
+def is_allowed(source, allowed):
+    """
+    Webcam : index listé tel quel. URL : même schéma, même hôte (et même port s'il est précisé),
+    chemin commençant par celui de l'entrée. Tube nommé : chemin réel sous un dossier (ou égal à un chemin) listé.
+    """
+    if source.isdigit():
+        return source in allowed
+    if source.lower().startswith(STREAM_SCHEMES):
+        url = urlsplit(source)
+        for entry in allowed:
+            if not entry.lower().startswith(STREAM_SCHEMES):
+                continue
+            expected = urlsplit(entry)
+            if (url.scheme.lower() == expected.scheme.lower() and url.hostname == expected.hostname
+                    and (expected.port is None or url.port == expected.port)
+                    and url.path.startswith(expected.path)):
+                return True
+        return False
+    path = os.path.realpath(source)
+    for entry in allowed:
+        if entry.isdigit() or entry.lower().startswith(STREAM_SCHEMES):
+            continue
+        folder = os.path.realpath(entry)
+        if path == folder or path.startswith(folder.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
+
+class LiveDecoder:
+    """
+    Lecture d'une source en direct, avec l'interface de VideoDecoder (pool de buffers, release()...).
+    Un thread de capture lit la source en continu, pour que le tampon de la caméra ou du flux ne
+    s'accumule pas, et ne garde que la dernière frame : une frame non lue avant l'arrivée de la
+    suivante est perdue (on_drop). read() retourne toujours la frame la plus récente ;
+    capture_time est l'instant (perf_counter) où elle a été capturée.
+    """
+
+    def __init__(self, source, buffer_count=32, max_width=None, fallback_fps=25.0, on_drop=None):
+        self.source = source
+        self.buffer_count = buffer_count
+        self.max_width = max_width
+        self.fallback_fps = fallback_fps  # Webcams et flux annoncent souvent un fps nul ou fantaisiste
+        self.on_drop = on_drop
+        self.error = None
+        self.cap = None
+        self.pool = None
+        self.fps = 0
+        self.total_frames = 0  # Inconnu : flux sans fin
+        self.source_size = (0, 0)
+        self.frame_size = (0, 0)
+        self.position = 0  # Index de la prochaine frame servie
+        self.capture_time = None
+        self.frames_captured = 0
+        self.dropped = 0  # Frames capturées puis remplacées avant d'être lues
+        self.capture_time_total = 0.0
+        self._scratch = None  # Deux buffers de capture en alternance : l'un publié, l'autre en écriture
+        self._next = 0
+        self._latest = None  # (frame, instant de capture)
+        self._ended = False
+        self._interrupted = threading.Event()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def open(self):
+        try:
+            self.cap = cv2.VideoCapture(parse_live_source(self.source))
+        except ValueError as e:
+            self.error = str(e)
+            return False
+        if not self.cap.isOpened():
+            self.cap.release()
+            return False
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Tampon minimal quand le backend le permet
+        ret, first = self.cap.read()
+        if not ret:
+            self.cap.release()
+            return False
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if 0 < fps <= 240 else self.fallback_fps
+        height, width = first.shape[:2]
+        self.source_size = (width, height)
+        if self.max_width and width > self.max_width:
+            self.frame_size = (self.max_width, int(round(height * self.max_width / width)))
+        else:
+            self.frame_size = (width, height)
+        self._scratch = [first, np.empty_like(first)]
+        self._next = 1
+        self._latest = (first, time.perf_counter())
+        self.frames_captured = 1
+        self.pool = FramePool(self.buffer_count, (self.frame_size[1], self.frame_size[0], 3))
+        self._thread = threading.Thread(target=self._capture, daemon=True)
+        self._thread.start()
+        return True
+
+    @property
+    def resized(self):
+        return self.frame_size != self.source_size
+
+    def seek(self, frame=None, time_s=None):
+        return self.position  # Source en direct : pas de positionnement
+
+    def _capture(self):
+        try:
+            while not self._interrupted.is_set():
+                start = time.perf_counter()
+                ret, frame = self.cap.read(self._scratch[self._next])
+                if not ret:
+                    break  # Fin du flux (caméra débranchée, tube fermé...)
+                now = time.perf_counter()
+                with self._cond:
+                    if self._latest is not None:
+                        self.dropped += 1
+                        if self.on_drop is not None:
+                            self.on_drop(1)
+                    self._latest = (frame, now)
+                    self._next ^= 1
+                    self.frames_captured += 1
+                    self.capture_time_total += now - start
+                    self._cond.notify_all()
+        finally:
+            # Libérée par le thread qui lit : un release() concurrent d'un read() bloquant n'est pas sûr
+            self.cap.release()
+            with self._cond:
+                self._ended = True
+                self._cond.notify_all()
+
+    def read(self):
+        """
+        (index, frame) de la frame la plus récente (attend la prochaine capture si elle a déjà été lue),
+        ou None en fin de flux / arrêt.
+        """
+        buffer = self.pool.acquire()
+        if buffer is None:
+            return None
+        with self._cond:
+            self._cond.wait_for(lambda: self._latest is not None or self._ended or self._interrupted.is_set())
+            if self._latest is None or self._interrupted.is_set():
+                self.pool.release(buffer)
+                return None
+            frame, self.capture_time = self._latest
+            self._latest = None
+            # Copie sous verrou : la capture n'écrit jamais dans le buffer publié
+            if self.resized:
+                cv2.resize(frame, self.frame_size, dst=buffer, interpolation=cv2.INTER_AREA)
+            else:
+                np.copyto(buffer, frame)
+        index = self.position
+        self.position += 1
+        return index, buffer
+
+    def release(self, frame):
+        self.pool.release(frame)
+
+    def interrupt(self):
+        self._interrupted.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self.pool is not None:
+            self.pool.close()
+
+    def close(self):
+        self.interrupt()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def stats(self):
+        return {
+            "source": str(self.source),
+            "frames_captured": self.frames_captured,
+            "frames_dropped": self.dropped,
+            "capture_fps": round(self.frames_captured / self.capture_time_total, 1) if self.capture_time_total else None,
+            "source_size": list(self.source_size),
+            "frame_size": list(self.frame_size),
+            "position": self.position,
+            "pool": self.pool.stats() if self.pool is not None else None,
+        }
+
+
+class LatencyBudget:
+    """
+    Budget de latence d'une source en direct, de la capture à la frame annotée :
+    - stale_count() : frames en tête d'un lot déjà hors budget, abandonnées sans être analysées
+      (la plus récente est toujours gardée, pour que le flux ne se fige pas) ;
+    - la taille des lots suit la latence mesurée de chaque lot : divisée par deux au-delà du budget,
+      augmentée d'une frame sous la moitié du budget (un lot plus grand amortit mieux l'inférence).
+    """
+
+    def __init__(self, budget=0.5, max_batch=8, min_batch=1):
+        self.budget = budget
+        self.max_batch = max_batch
+        self.min_batch = min_batch
+        self.batch_size = min_batch
+        self.dropped = Counter()  # raison -> frames abandonnées
+        self.batches = 0
+        self.lag = None  # Latence de la plus ancienne frame du dernier lot (secondes)
+        self.lag_avg = None
+        self.lag_max = 0.0
+        self.batch_latency = None  # Durée de traitement du dernier lot
+        self.over_budget = 0  # Lots servis au-delà du budget
+        self._lock = threading.Lock()
+
+    def stale_count(self, capture_times, now=None):
+        now = time.perf_counter() if now is None else now
+        stale = sum(1 for capture_time in capture_times if now - capture_time > self.budget)
+        return min(stale, len(capture_times) - 1)
+
+    def drop(self, count, reason):
+        with self._lock:
+            self.dropped[reason] += count
+        metrics.FRAMES_DROPPED.inc(count, reason=f"live_{reason}")
+
+    def update(self, batch_latency, lag):
+        with self._lock:
+            self.batches += 1
+            self.batch_latency = batch_latency
+            self.lag = lag
+            self.lag_avg = lag if self.lag_avg is None else 0.9 * self.lag_avg + 0.1 * lag
+            self.lag_max = max(self.lag_max, lag)
+            if lag > self.budget:
+                self.over_budget += 1
+                self.batch_size = max(self.min_batch, self.batch_size // 2)
+            elif lag < 0.5 * self.budget:
+                self.batch_size = min(self.max_batch, self.batch_size + 1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "budget_ms": round(self.budget * 1000),
+                "batch_size": self.batch_size,
+                "batches": self.batches,
+                "over_budget": self.over_budget,
+                "dropped": dict(self.dropped),
+                "dropped_total": sum(self.dropped.values()),
+                "lag_ms": round(self.lag * 1000, 1) if self.lag is not None else None,
+                "lag_avg_ms": round(self.lag_avg * 1000, 1) if self.lag_avg is not None else None,
+                "lag_max_ms": round(self.lag_max * 1000, 1),
+                "batch_latency_ms": round(self.batch_latency * 1000, 1) if self.batch_latency is not None else None,
+            }
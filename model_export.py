@@ -0,0 +1,90 @@
+# Backends d'inférence : export ONNX / OpenVINO des poids PyTorch, mis en cache au premier usage
+import os
+import shutil
+import time
+from detection_cache import file_hash
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+# Précisions disponibles sur CPU pour chaque backend
+PRECISIONS = {
+    "pytorch": ("fp32",),
+    "onnx": ("fp32", "int8"),  # int8 : quantification dynamique ONNX Runtime
+    "openvino": ("fp32", "fp16", "int8"),  # int8 : quantification NNCF (calibration)
+}
+
+
+def exported_model_path(model_path, backend="pytorch", precision="fp32", export_dir="models/exports",
+                        calibration_data=None):
+    """
+    Chemin du modèle à charger pour un backend et une précision ; l'export est réalisé une seule fois
+    puis réutilisé. Le nom contient l'empreinte des poids : un nouvel entraînement crée un nouvel export.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend inconnu : {backend} (choix : {', '.join(BACKENDS)})")
+    if precision not in PRECISIONS[backend]:
+        raise ValueError(f"Précision {precision} indisponible pour {backend} "
+                         f"(choix : {', '.join(PRECISIONS[backend])})")
+    if backend == "pytorch":
+        return model_path
+
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    name = f"{stem}_{file_hash(model_path)[:12]}_{backend}_{precision}"
+    target = os.path.join(export_dir, name + (".onnx" if backend == "onnx" else "_openvino_model"))
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(export_dir, exist_ok=True)
+    print(f"Export du modèle {model_path} ({backend}, {precision})...")
+    start = time.perf_counter()
+    if backend == "onnx":
+        _export_onnx(model_path, target, precision)
+    else:
+        _export_openvino(model_path, target, precision, calibration_data)
+    print(f"Modèle exporté vers {target} en {time.perf_counter() - start:.1f}s")
+    return target
+
+
+def _export(model_path, **kwargs):
+    from ultralytics import YOLO
+    # Entrée dynamique : la taille d'inférence reste réglable par job
+    return str(YOLO(model_path).export(dynamic=True, **kwargs))
+
+
+def _publish(source, target):
+    """
+    Déplace un export terminé vers son emplacement définitif (un export concurrent peut l'avoir précédé).
+    """
+    temporary = f"{target}.tmp{os.getpid()}"
+    shutil.move(source, temporary)
+    try:
+        os.replace(temporary, target)
+    except OSError:
+        if not os.path.exists(target):
+            raise
+        shutil.rmtree(temporary, ignore_errors=True)
+
+
+def _export_onnx(model_path, target, precision):
+    exported = _export(model_path, format="onnx", simplify=True)
+    if precision == "fp32":
+        _publish(exported, target)
+        return
+
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantized = f"{exported}.int8"
+    quantize_dynamic(exported, quantized, weight_type=QuantType.QUInt8)
+    # Les métadonnées (noms des classes, stride) sont lues par ultralytics au chargement
+    source_model, quantized_model = onnx.load(exported), onnx.load(quantized)
+    del quantized_model.metadata_props[:]
+    quantized_model.metadata_props.extend(source_model.metadata_props)
+    onnx.save(quantized_model, quantized)
+    os.remove(exported)
+    _publish(quantized, target)
+
+
+def _export_openvino(model_path, target, precision, calibration_data):
+    options = {"half": precision == "fp16", "int8": precision == "int8"}
+    if precision == "int8" and calibration_data:
+        options["data"] = calibration_data
+    _publish(_export(model_path, format="openvino", **options), target)
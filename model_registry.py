@@ -0,0 +1,160 @@
+# Registre des modèles YOLO partagés par tout le processus
+import threading
+import time
+import numpy as np
+from ultralytics import YOLO
+from utils import get_memory_usage
+
+
+class SharedModel:
+    """
+    Modèle YOLO chargé une seule fois et partagé entre les jobs.
+    Le prédicteur ultralytics n'est pas thread-safe : chaque exemplaire (replica) ne sert qu'un
+    appel à predict à la fois. Avec replicas=1 (défaut), les jobs qui partagent ces poids font donc
+    leurs inférences l'une après l'autre ; avec replicas > 1, des exemplaires supplémentaires sont
+    chargés à la demande (quand tous sont occupés), au prix de leur mémoire, pour inférer en parallèle.
+    """
+
+    def __init__(self, model_path, device='cpu', replicas=1):
+        self.model_path = model_path
+        self.device = device
+        self.replicas = max(1, replicas)
+        self._cond = threading.Condition()
+        self._free = []  # Exemplaires disponibles
+        self._loaded = 0  # Exemplaires chargés ou en cours de chargement
+        self.waits = 0  # Appels ayant attendu un exemplaire libre
+
+        rss_before = get_memory_usage()
+        start = time.perf_counter()
+        self.model = self._load()
+        self._loaded = 1
+        self._free.append(self.model)
+        self.load_time = time.perf_counter() - start
+        self.memory = max(0, get_memory_usage() - rss_before)  # Par exemplaire
+        self.warmup_time = None
+
+    def _load(self):
+        if self.model_path.endswith('.pt'):
+            model = YOLO(self.model_path)
+            model.to(self.device)
+            return model
+        # Modèle exporté (ONNX, OpenVINO) : la tâche n'est pas toujours déductible du fichier
+        return YOLO(self.model_path, task='detect')
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def _acquire(self):
+        with self._cond:
+            if not self._free and self._loaded < self.replicas:
+                self._loaded += 1
+                load = True
+            else:
+                load = False
+                if not self._free:
+                    self.waits += 1
+                    self._cond.wait_for(lambda: self._free)
+                return self._free.pop()
+        # Chargement hors verrou : les autres exemplaires restent utilisables
+        try:
+            model = self._load()
+        except Exception:
+            with self._cond:
+                self._loaded -= 1
+            raise
+        print(f"Modèle {self.model_path} : exemplaire {self._loaded}/{self.replicas} chargé")
+        return model
+
+    def _release(self, model):
+        with self._cond:
+            self._free.append(model)
+            self._cond.notify()
+
+    def predict(self, frames, **kwargs):
+        model = self._acquire()
+        try:
+            return model.predict(frames, verbose=False, **kwargs)
+        finally:
+            self._release(model)
+
+    def warmup(self, imgsz=640):
+        """
+        Première inférence sur une image vide pour initialiser le prédicteur.
+        """
+        start = time.perf_counter()
+        self.predict([np.zeros((imgsz, imgsz, 3), dtype=np.uint8)], imgsz=imgsz)
+        self.warmup_time = time.perf_counter() - start
+
+    def stats(self):
+        return {
+            "model_path": self.model_path,
+            "device": self.device,
+            "load_time_s": round(self.load_time, 3),
+            "memory_bytes": self.memory,
+            "warmup_time_s": None if self.warmup_time is None else round(self.warmup_time, 3),
+            "replicas": self._loaded,
+            "max_replicas": self.replicas,
+            "waits": self.waits,
+        }
+
+
+class ModelRegistry:
+    """
+    Charge chaque fichier de poids à la demande, une seule fois, même en cas d'accès concurrents.
+    """
+
+    def __init__(self, replicas=1):
+        self.replicas = replicas  # Exemplaires max par modèle (voir SharedModel)
+        self._models = {}
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def get(self, model_path, device='cpu'):
+        key = (model_path, device)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+            # Un seul thread charge ; les autres attendent la fin du chargement
+            event = self._loading.get(key)
+            loader = event is None
+            if loader:
+                event = self._loading[key] = threading.Event()
+
+        if not loader:
+            event.wait()
+            with self._lock:
+                if key in self._models:
+                    return self._models[key]
+            return self.get(model_path, device)
+
+        try:
+            model = SharedModel(model_path, device, self.replicas)
+            with self._lock:
+                self._models[key] = model
+            print(f"Modèle {model_path} chargé en {model.load_time:.2f}s")
+            return model
+        finally:
+            with self._lock:
+                del self._loading[key]
+            event.set()
+
+    def warmup(self, model_paths, device='cpu'):
+        for model_path in model_paths:
+            self.get(model_path, device).warmup()
+
+    def stats(self):
+        with self._lock:
+            models = list(self._models.values())
+        return {
+            "process_memory_bytes": get_memory_usage(),
+            "models": [model.stats() for model in models],
+        }
+
+
+registry = ModelRegistry()
+
+
+def get_model(model_path, device='cpu'):
+    return registry.get(model_path, device)
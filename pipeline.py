@@ -0,0 +1,144 @@
+# Primitives communes aux étapes du pipeline (lecture, détection, export, flux)
+import threading
+import time
+from collections import deque
+from metrics import STAGE_SECONDS
+
+
+class QueueClosed(Exception):
+    """
+    Levée par ClosableQueue quand la file est fermée (fin de flux) ou annulée (arrêt).
+    """
+
+
+class ClosableQueue:
+    """
+    File bornée entièrement bloquante (pas d'attente active) :
+    - close() : fin de flux, les consommateurs vident la file puis reçoivent QueueClosed ;
+    - cancel() : arrêt immédiat, producteurs et consommateurs bloqués sont réveillés.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def qsize(self):
+        with self._cond:
+            return len(self._items)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def put(self, item):
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or len(self._items) < self.maxsize)
+            if self._closed:
+                raise QueueClosed()
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def put_latest(self, item):
+        """
+        Ajout sans attente (sources en direct) : si la file est pleine, les éléments les plus anciens
+        sont retirés au profit du nouveau et retournés, pour libérer leurs ressources.
+        """
+        with self._cond:
+            if self._closed:
+                raise QueueClosed()
+            dropped = []
+            while len(self._items) >= self.maxsize:
+                dropped.append(self._items.popleft())
+            self._items.append(item)
+            self._cond.notify_all()
+            return dropped
+
+    def get(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._closed)
+            if not self._items:
+                raise QueueClosed()
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def cancel(self):
+        with self._cond:
+            self._closed = True
+            self._items.clear()
+            self._cond.notify_all()
+
+
+class StageStats:
+    """
+    Latences d'une étape (secondes) : nombre, moyenne, max et dernières valeurs.
+    """
+
+    def __init__(self, window=100):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, duration):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.recent.append(duration)
+
+    def to_dict(self):
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "mean_ms": round(1000 * self.total / self.count, 2) if self.count else None,
+            "max_ms": round(1000 * self.max, 2),
+            "p50_ms": round(1000 * recent[len(recent) // 2], 2) if recent else None,
+            "p95_ms": round(1000 * recent[int(len(recent) * 0.95)], 2) if recent else None,
+        }
+
+
+class LatencyTracker:
+    """
+    Latence par étape du pipeline et de bout en bout (décodage -> frame diffusée/exportée).
+    Chaque mesure alimente aussi l'histogramme global pipeline_stage_seconds (/metrics).
+    """
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, duration):
+        STAGE_SECONDS.observe(duration, stage=stage)
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats()
+            stats.record(duration)
+
+    def measure(self, stage):
+        return _Measure(self, stage)
+
+    def to_dict(self):
+        with self._lock:
+            return {stage: stats.to_dict() for stage, stats in self._stages.items()}
+
+
+class _Measure:
+    def __init__(self, latency, stage):
+        self.latency = latency
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.latency.record(self.stage, time.perf_counter() - self.start)
+        return False
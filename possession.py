@@ -0,0 +1,133 @@
+# Possession du ballon : joueur le plus proche, lissage temporel et statistiques par équipe
+import threading
+from collections import Counter
+import numpy as np
+from track_store import PLAYER, BALL
+
+
+class PossessionTracker:
+    """
+    À chaque frame, distance du centre du ballon aux deux pieds (coins bas de la boîte) de tous
+    les joueurs en un seul calcul NumPy ; le plus proche est candidat s'il est à moins de
+    distance_ratio x la taille médiane des joueurs de la frame (seuil indépendant de la résolution).
+    Lissage : un porteur (y compris le premier, ballon libre ou coup d'envoi) n'est retenu qu'après
+    switch_frames frames consécutives comme joueur le plus proche, et le
+    porteur est conservé hold_frames frames sans candidat (passe, ballon perdu de vue).
+    Les statistiques sont cumulées au fil du flux (aucune relecture des suivis) ; stats() peut être
+    appelé depuis un autre thread (routes de statut) pendant update().
+    """
+
+    def __init__(self, distance_ratio=0.8, switch_frames=3, hold_frames=25):
+        self.distance_ratio = distance_ratio
+        self.switch_frames = switch_frames
+        self.hold_frames = hold_frames
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self.holder = None  # track_id du porteur
+        self.holder_team = -1
+        self._candidate = None
+        self._candidate_frames = 0
+        self._unseen_frames = 0
+        self.frames = 0  # Frames traitées
+        self.frames_held = 0  # Frames avec un porteur
+        self.team_frames = np.zeros(2, dtype=np.int64)
+        self.player_frames = Counter()
+        self.changes = 0
+
+    def update(self, store, frame_start, n_frames, teams=None):
+        """
+        Traite les frames [frame_start, frame_start + n_frames) du store ; retourne has_ball
+        (booléen par ligne du store : ligne du porteur). teams : équipe par ligne (TeamAssigner).
+        """
+        has_ball = np.zeros(len(store), dtype=bool)
+        rows = store.frame_rows(frame_start, frame_start + n_frames)
+        bounds = np.searchsorted(store.frame[rows], np.arange(frame_start, frame_start + n_frames + 1))
+        with self._lock:
+            self._update(store, rows, bounds, n_frames, teams, has_ball)
+        return has_ball
+
+    def _update(self, store, rows, bounds, n_frames, teams, has_ball):
+        for frame_num in range(n_frames):
+            frame_rows = rows[bounds[frame_num]:bounds[frame_num + 1]]
+            kinds = store.kind[frame_rows]
+            players = frame_rows[kinds == PLAYER]
+            balls = frame_rows[kinds == BALL]
+            self._step(self._closest_player(store, players, balls))
+
+            holder_row = None
+            if self.holder is not None:
+                match = players[store.track_id[players] == self.holder]
+                if len(match):
+                    holder_row = match[0]
+                    has_ball[holder_row] = True
+                    if teams is not None and teams[holder_row] >= 0:
+                        self.holder_team = int(teams[holder_row])
+            self._count()
+
+    def _closest_player(self, store, players, balls):
+        if not len(players) or not len(balls):
+            return None
+        ball = store.bbox[balls[-1]]
+        ball_center = np.array([(ball[0] + ball[2]) / 2, (ball[1] + ball[3]) / 2], dtype=np.float32)
+        boxes = store.bbox[players]
+        # Pieds gauche et droit : (n, 2, 2)
+        feet = np.stack([boxes[:, [0, 3]], boxes[:, [2, 3]]], axis=1)
+        distances = np.sqrt(((feet - ball_center) ** 2).sum(axis=-1)).min(axis=1)
+        closest = int(distances.argmin())
+        max_distance = self.distance_ratio * float(np.median(boxes[:, 3] - boxes[:, 1]))
+        if distances[closest] > max_distance:
+            return None
+        return int(store.track_id[players[closest]])
+
+    def _step(self, closest):
+        if closest is None:
+            self._candidate, self._candidate_frames = None, 0
+            self._unseen_frames += 1
+            if self.holder is not None and self._unseen_frames > self.hold_frames:
+                self.holder, self.holder_team = None, -1  # Ballon libre
+            return
+        if closest == self.holder:
+            self._candidate, self._candidate_frames = None, 0
+            self._unseen_frames = 0
+            return
+        if closest == self._candidate:
+            self._candidate_frames += 1
+        else:
+            self._candidate, self._candidate_frames = closest, 1
+        if self._candidate_frames >= self.switch_frames:
+            self.holder, self.holder_team = closest, -1
+            self._candidate, self._candidate_frames = None, 0
+            self._unseen_frames = 0
+            self.changes += 1
+
+    def _count(self):
+        self.frames += 1
+        if self.holder is None:
+            return
+        self.frames_held += 1
+        self.player_frames[self.holder] += 1
+        if self.holder_team >= 0:
+            self.team_frames[self.holder_team] += 1
+
+    def stats(self, top=3):
+        with self._lock:
+            return self._stats(top)
+
+    def _stats(self, top):
+        team_total = int(self.team_frames.sum())
+        return {
+            "frames": self.frames,
+            "frames_held": self.frames_held,
+            "team_share": [round(int(count) / team_total, 3) for count in self.team_frames] if team_total else None,
+            "holder": self.holder,
+            "holder_team": self.holder_team if self.holder_team >= 0 else None,
+            "changes": self.changes,
+            "top_players": [{"track_id": track_id, "frames": frames}
+                            for track_id, frames in self.player_frames.most_common(top)],
+        }
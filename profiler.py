@@ -0,0 +1,87 @@
+# Profileur par échantillonnage des threads d'un job (activé à la demande)
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Relève périodiquement la pile d'appels des threads surveillés (sys._current_frames) et
+    compte les piles identiques. Le résultat est au format "collapsed" (une pile par ligne :
+    thread;fonction;fonction... nombre) lisible par flamegraph.pl ou speedscope.
+    Coût : un parcours de pile par thread et par intervalle, aucun hook sur le code profilé.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._threads = {}  # ident -> nom affiché
+        self._stacks = Counter()
+        self._lock = threading.Lock()  # Piles lues (/profile) pendant que l'échantillonneur les compte
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = None
+        self.duration = 0.0
+
+    def add_thread(self, thread, name=None):
+        if thread is not None and thread.ident is not None:
+            self._threads[thread.ident] = name or thread.name
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self.duration = time.time() - self.started_at
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            stacks = [self._collapse(name, frames[ident])
+                      for ident, name in list(self._threads.items()) if ident in frames]
+            del frames
+            with self._lock:
+                for stack in stacks:
+                    self._stacks[stack] += 1
+            self.samples += 1
+
+    def stacks(self):
+        """
+        Copie des compteurs de piles (cohérente même pendant l'échantillonnage).
+        """
+        with self._lock:
+            return Counter(self._stacks)
+
+    def _collapse(self, name, frame):
+        calls = []
+        while frame is not None and len(calls) < self.max_depth:
+            code = frame.f_code
+            calls.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join([name] + calls[::-1])
+
+    def top(self, n=20):
+        """
+        Fonctions les plus souvent en haut de pile (temps propre), en proportion des échantillons.
+        """
+        own = Counter()
+        for stack, count in self.stacks().items():
+            own[stack.rsplit(";", 1)[-1]] += count
+        total = sum(own.values()) or 1
+        return [(function, round(count / total, 3)) for function, count in own.most_common(n)]
+
+    def dump(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, count in self.stacks().most_common():
+                f.write(f"{stack} {count}\n")
+        return path
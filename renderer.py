@@ -0,0 +1,176 @@
+# Rendu vectorisé des annotations (joueurs, arbitres, ballon)
+import cv2
+import numpy as np
+from track_store import PLAYER, REFEREE, BALL, CLASS_NAMES
+
+KIND_NAMES = {"players": PLAYER, "referees": REFEREE, "ball": BALL}
+
+DEFAULT_PLAYER_COLOR = (0, 100, 255)
+REFEREE_COLOR = (0, 255, 255)
+BALL_COLOR = (0, 255, 0)
+HAS_BALL_COLOR = (0, 0, 255)
+# Arc des ellipses au pied des joueurs (degrés, sens horaire à l'écran) : repris par l'overlay client
+ELLIPSE_START_ANGLE = -45
+ELLIPSE_END_ANGLE = 235
+
+
+def frame_arrays(frame_tracks):
+    """
+    Convertit les suivis d'une frame ({"players": {id: {...}}, ...}) en tableaux :
+    boîtes (n, 4) float32, type (n,), identifiants (n,), couleurs (n, 3), possession (n,), étiquettes.
+    """
+    boxes, kinds, track_ids, colors, has_ball, labels = [], [], [], [], [], []
+    for object, kind in KIND_NAMES.items():
+        for track_id, track_info in frame_tracks.get(object, {}).items():
+            boxes.append(track_info["bbox"])
+            kinds.append(kind)
+            track_ids.append(track_id)
+            if kind == PLAYER:
+                colors.append(track_info.get("team_color", DEFAULT_PLAYER_COLOR))
+                labels.append(track_info.get("class_name", ""))
+            else:
+                colors.append(REFEREE_COLOR if kind == REFEREE else BALL_COLOR)
+                labels.append("")
+            has_ball.append(bool(track_info.get("has_ball", False)))
+    if not boxes:
+        return (np.empty((0, 4), np.float32), np.empty(0, np.int8), np.empty(0, np.int64),
+                np.empty((0, 3), np.int32), np.empty(0, bool), [])
+    return (np.asarray(boxes, np.float32), np.asarray(kinds, np.int8), np.asarray(track_ids, np.int64),
+            np.asarray(colors, np.int32).reshape(-1, 3), np.asarray(has_ball, bool), labels)
+
+
+class AnnotationRenderer:
+    """
+    Dessine les annotations directement dans le buffer de la frame (aucune copie).
+    La géométrie de toutes les ellipses et triangles d'une frame est calculée en une fois
+    avec NumPy, puis tracée en un appel OpenCV par couleur ; les étiquettes sont rastérisées
+    une seule fois puis recopiées (sprites).
+    overlay_scale < 1 réduit la frame avant le dessin (flux plus léger à encoder).
+    """
+
+    def __init__(self, overlay_scale=1.0, arc_points=24):
+        self.overlay_scale = overlay_scale
+        # Arc unitaire de l'ellipse, identique à l'ancien cv2.ellipse
+        angles = np.deg2rad(np.linspace(ELLIPSE_START_ANGLE, ELLIPSE_END_ANGLE, arc_points))
+        self._unit_arc = np.stack([np.cos(angles), np.sin(angles)], axis=1).astype(np.float32)
+        self._unit_triangle = np.array([[0, 0], [-10, -20], [10, -20]], dtype=np.float32)
+        self._sprites = {}  # étiquette -> masque (h, w) booléen
+
+    def output_size(self, width, height):
+        if self.overlay_scale == 1.0:
+            return width, height
+        return int(width * self.overlay_scale), int(height * self.overlay_scale)
+
+    def prepare(self, frame):
+        """
+        Frame sur laquelle dessiner : la frame elle-même, ou sa version réduite.
+        """
+        if self.overlay_scale == 1.0:
+            return frame
+        width, height = self.output_size(frame.shape[1], frame.shape[0])
+        return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+    def draw_annotations(self, video_frames, tracks):
+        """
+        Même interface que Tracker.draw_annotations ; les frames sont modifiées sur place
+        (ou remplacées par leur version réduite) et retournées.
+        """
+        output_video_frames = []
+        for frame_num, frame in enumerate(video_frames):
+            frame_tracks = {object: tracks[object][frame_num] for object in KIND_NAMES}
+            frame = self.prepare(frame)
+            self.render(frame, *frame_arrays(frame_tracks))
+            output_video_frames.append(frame)
+        return output_video_frames
+
+    def draw_store(self, video_frames, store, frame_start, colors=None, has_ball=None):
+        """
+        Rendu direct depuis un TrackStore (sans passer par les dictionnaires) ;
+        video_frames[i] correspond à la frame frame_start + i.
+        colors / has_ball (facultatifs) : couleur (n, 3) et possession de chaque ligne du store.
+        """
+        output_video_frames = []
+        for frame_num, frame in enumerate(video_frames):
+            rows = store.frame_rows(frame_start + frame_num)
+            kinds = store.kind[rows]
+            labels = [CLASS_NAMES[PLAYER] if kind == PLAYER else "" for kind in kinds.tolist()]
+            frame = self.prepare(frame)
+            self.render(frame, store.bbox[rows], kinds, store.track_id[rows],
+                        colors=colors[rows] if colors is not None else None,
+                        has_ball=has_ball[rows] if has_ball is not None else None, labels=labels)
+            output_video_frames.append(frame)
+        return output_video_frames
+
+    def render(self, frame, boxes, kinds, track_ids=None, colors=None, has_ball=None, labels=None):
+        if len(boxes) == 0:
+            return frame
+        if self.overlay_scale != 1.0:
+            boxes = boxes * self.overlay_scale
+        if colors is None:
+            colors = np.where((kinds == REFEREE)[:, None], REFEREE_COLOR,
+                              np.where((kinds == BALL)[:, None], BALL_COLOR, DEFAULT_PLAYER_COLOR))
+        if has_ball is None:
+            has_ball = np.zeros(len(boxes), bool)
+
+        x_center = ((boxes[:, 0] + boxes[:, 2]) / 2).astype(np.int32)
+        y_top = boxes[:, 1].astype(np.int32)
+        y_bottom = boxes[:, 3].astype(np.int32)
+
+        # Ellipses (joueurs et arbitres) : polylignes calculées pour toutes les boîtes à la fois
+        people = kinds != BALL
+        if people.any():
+            width = (boxes[people, 2] - boxes[people, 0]).astype(np.int32)
+            axes = np.stack([width, (0.35 * width).astype(np.int32)], axis=1).astype(np.float32)
+            centers = np.stack([x_center[people], y_bottom[people]], axis=1).astype(np.float32)
+            arcs = np.rint(centers[:, None, :] + axes[:, None, :] * self._unit_arc[None]).astype(np.int32)
+            self._polylines_by_color(frame, arcs, colors[people], closed=False, thickness=2)
+
+        # Triangles (ballon et joueur en possession)
+        triangles = (kinds == BALL) | has_ball
+        if triangles.any():
+            tips = np.stack([x_center[triangles], y_top[triangles]], axis=1).astype(np.float32)
+            points = (tips[:, None, :] + self._unit_triangle[None]).astype(np.int32)
+            fill_colors = np.where((kinds[triangles] == BALL)[:, None], BALL_COLOR, HAS_BALL_COLOR)
+            for color in np.unique(fill_colors, axis=0):
+                selected = (fill_colors == color).all(axis=1)
+                cv2.fillPoly(frame, list(points[selected]), tuple(int(c) for c in color))
+            cv2.polylines(frame, list(points), True, (0, 0, 0), 2)
+
+        # Étiquettes (sprites mis en cache)
+        if labels:
+            label_x = x_center - 40 + 10
+            label_y = y_bottom - 10 + 15 + 15
+            for i, label in enumerate(labels):
+                if label:
+                    self._blit_label(frame, label, int(label_x[i]), int(label_y[i]))
+        return frame
+
+    @staticmethod
+    def _polylines_by_color(frame, polylines, colors, closed, thickness):
+        colors = np.asarray(colors)
+        for color in np.unique(colors, axis=0):
+            selected = (colors == color).all(axis=1)
+            cv2.polylines(frame, list(polylines[selected]), closed, tuple(int(c) for c in color),
+                          thickness, lineType=cv2.LINE_4)
+
+    def _label_sprite(self, label):
+        sprite = self._sprites.get(label)
+        if sprite is None:
+            (text_w, text_h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+            canvas = np.zeros((text_h + baseline + 4, text_w + 4), np.uint8)
+            cv2.putText(canvas, label, (2, text_h + 2), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 255, 2)
+            sprite = (canvas > 0, text_h + 2)
+            self._sprites[label] = sprite
+        return sprite
+
+    def _blit_label(self, frame, label, x, y, color=(0, 0, 0)):
+        mask, baseline_offset = self._label_sprite(label)
+        x0, y0 = x - 2, y - baseline_offset
+        h, w = mask.shape
+        # Découpage aux bords de l'image
+        fx0, fy0 = max(x0, 0), max(y0, 0)
+        fx1, fy1 = min(x0 + w, frame.shape[1]), min(y0 + h, frame.shape[0])
+        if fx0 >= fx1 or fy0 >= fy1:
+            return
+        region = frame[fy0:fy1, fx0:fx1]
+        region[mask[fy0 - y0:fy1 - y0, fx0 - x0:fx1 - x0]] = color
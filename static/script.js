@@ -5,6 +5,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const processingStatus = document.getElementById('processingStatus');
     const videoFeed = document.getElementById('videoFeed');
     const deleteAllUploadsBtn = document.getElementById('deleteAllUploadsBtn');
+    let currentJobId = null;
 
     videoList.addEventListener('change', function() {
         startProcessingBtn.disabled = !this.value;
@@ -23,10 +24,11 @@ document.addEventListener('DOMContentLoaded', function() {
             .then(response => response.json())
             .then(data => {
                 if (data.status === 'success') {
+                    currentJobId = data.job_id;
+                    videoFeed.src = '/video_feed/' + currentJobId;
                     stopProcessingBtn.disabled = false;
                     startProcessingBtn.disabled = true;
                     processingStatus.textContent = 'Statut: Démarrage du traitement...';
-                    // Le flux vidéo devrait commencer à s'afficher automatiquement via l'attribut src de l'image
                 } else {
                     alert(data.message || 'Erreur lors de la sélection de la vidéo.');
                 }
@@ -39,7 +41,8 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     stopProcessingBtn.addEventListener('click', function() {
-        fetch('/stop_video', {
+        if (!currentJobId) return;
+        fetch('/cancel/' + currentJobId, {
             method: 'POST'
         })
         .then(response => response.json())
@@ -48,7 +51,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 stopProcessingBtn.disabled = true;
                 startProcessingBtn.disabled = false;
                 processingStatus.textContent = 'Statut: Traitement arrêté.';
-                videoFeed.src = "{{ url_for('video_feed') }}"; // Reset le flux (peut-être pas nécessaire)
+                videoFeed.src = "";
             } else {
                 alert('Erreur lors de l\'arrêt du traitement.');
             }
@@ -100,7 +103,8 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     function updateStatus() {
-        fetch('/get_status')
+        if (!currentJobId) return;
+        fetch('/get_status/' + currentJobId)
         .then(response => response.json())
         .then(data => {
             processingStatus.textContent = `Statut: ${data.status}${data.status === 'saving' ? ' (Sauvegarde en cours...)' : ''}`;
@@ -0,0 +1,160 @@
+# Attribution des équipes d'après la couleur des maillots, mise en cache par track
+import cv2
+import numpy as np
+from track_store import PLAYER, REFEREE, BALL, FLAG_PROPAGATED
+from renderer import DEFAULT_PLAYER_COLOR, REFEREE_COLOR, BALL_COLOR
+
+
+def kmeans2(points, centers, iterations=8):
+    """
+    2-means vectorisé sur un lot de nuages de points : points (m, k, 3), centres initiaux (m, 2, 3).
+    Retourne les centres (m, 2, 3) et l'étiquette de chaque point (m, k).
+    """
+    centers = centers.copy()
+    for _ in range(iterations):
+        distances = ((points[:, :, None, :] - centers[:, None, :, :]) ** 2).sum(axis=-1)
+        labels = distances.argmin(axis=-1)
+        for cluster in (0, 1):
+            mask = (labels == cluster)[..., None]
+            counts = mask.sum(axis=1)
+            sums = (points * mask).sum(axis=1)
+            centers[:, cluster] = np.where(counts > 0, sums / np.maximum(counts, 1), centers[:, cluster])
+    return centers, labels
+
+
+class TeamAssigner:
+    """
+    Équipe de chaque joueur à partir de la couleur de son maillot :
+    - haut de la boîte (torse) réduit à patch_size x patch_size, puis séparation maillot / fond
+      (pelouse) par un 2-means calculé pour tous les joueurs du lot en une passe NumPy ;
+    - les deux couleurs d'équipe sont apprises sur les premiers maillots vus (2-means global) ;
+    - le résultat est mis en cache par track ByteTrack et n'est réévalué que si la confiance
+      est faible (min_confidence) ou toutes les interval frames : au plus un recadrage par track et par lot.
+    """
+
+    def __init__(self, interval=250, min_confidence=0.3, patch_size=8, min_players=6, max_tracks=1000):
+        self.interval = interval
+        self.min_confidence = min_confidence
+        self.patch_size = patch_size
+        self.min_players = min_players
+        self.max_tracks = max_tracks  # Au-delà, les tracks non revues depuis longtemps sont oubliées
+        self.team_colors = None  # (2, 3) BGR, appris au premier lot avec assez de joueurs
+        self.evaluations = 0  # Recadrages classés depuis le début
+        self._tracks = {}  # track_id -> (équipe, confiance, frame de l'évaluation)
+        # Pixels des coins du patch : le fond y domine
+        p = patch_size
+        self._corners = np.array([0, p - 1, p * (p - 1), p * p - 1])
+        self._center = np.array([(p // 2) * p + p // 2, (p // 2 - 1) * p + p // 2])
+
+    def reset(self):
+        self.team_colors = None
+        self._tracks.clear()
+
+    def assign(self, frames, store, frame_start):
+        """
+        Équipe (0 ou 1, -1 si inconnue ou non joueur) de chaque ligne du store ;
+        frames[i] correspond à la frame frame_start + i (avant dessin des annotations).
+        """
+        teams = np.full(len(store), -1, dtype=np.int8)
+        players = np.flatnonzero(store.kind == PLAYER)
+        if not len(players):
+            return teams
+        track_ids, inverse = np.unique(store.track_id[players], return_inverse=True)
+
+        rows = self._rows_to_evaluate(store, players, track_ids, inverse)
+        if len(rows):
+            colors, valid = self._jersey_colors(frames, store, rows, frame_start)
+            rows, colors = rows[valid], colors[valid]
+            if self.team_colors is None and len(colors) >= self.min_players:
+                self._fit_teams(colors)
+            if self.team_colors is not None and len(rows):
+                self._classify(store, rows, colors)
+                if len(self._tracks) > self.max_tracks:
+                    self._prune(int(store.frame.max()))
+
+        team_of_track = np.array([self._tracks.get(track_id, (-1,))[0] for track_id in track_ids.tolist()],
+                                 dtype=np.int8)
+        teams[players] = team_of_track[inverse]
+        return teams
+
+    def _rows_to_evaluate(self, store, players, track_ids, inverse):
+        # Une ligne par track à (ré)évaluer : la première du lot issue d'une vraie détection
+        detected = (store.flags[players] & FLAG_PROPAGATED) == 0
+        rows = []
+        for i, track_id in enumerate(track_ids.tolist()):
+            candidates = players[(inverse == i) & detected]
+            if not len(candidates):
+                continue
+            row = candidates[0]
+            cached = self._tracks.get(track_id)
+            if (cached is None or cached[1] < self.min_confidence
+                    or store.frame[row] - cached[2] >= self.interval):
+                rows.append(row)
+        return np.asarray(rows, dtype=np.int64)
+
+    def _jersey_colors(self, frames, store, rows, frame_start):
+        p = self.patch_size
+        patches = np.zeros((len(rows), p * p, 3), dtype=np.float32)
+        valid = np.zeros(len(rows), dtype=bool)
+        for i, row in enumerate(rows.tolist()):
+            frame = frames[int(store.frame[row]) - frame_start]
+            x1, y1, x2, y2 = store.bbox[row]
+            x1, x2 = max(int(x1), 0), min(int(x2), frame.shape[1])
+            y1, y2 = max(int(y1), 0), min(int((y1 + y2) / 2), frame.shape[0])  # Moitié haute : torse
+            if x2 - x1 < 2 or y2 - y1 < 2:
+                continue
+            patches[i] = cv2.resize(frame[y1:y2, x1:x2], (p, p), interpolation=cv2.INTER_AREA).reshape(-1, 3)
+            valid[i] = True
+        self.evaluations += int(valid.sum())
+
+        # Fond initialisé sur les coins, maillot sur le centre du patch
+        initial = np.stack([patches[:, self._corners].mean(axis=1), patches[:, self._center].mean(axis=1)], axis=1)
+        centers, labels = kmeans2(patches, initial)
+        # Le cluster majoritaire dans les coins est le fond
+        background = (labels[:, self._corners].mean(axis=1) > 0.5).astype(np.int64)
+        return centers[np.arange(len(rows)), 1 - background], valid
+
+    def _fit_teams(self, colors):
+        # Initialisation déterministe : couleur la plus éloignée de la moyenne, puis la plus éloignée de celle-ci
+        first = colors[((colors - colors.mean(axis=0)) ** 2).sum(axis=1).argmax()]
+        second = colors[((colors - first) ** 2).sum(axis=1).argmax()]
+        centers, _ = kmeans2(colors[None], np.stack([first, second])[None], iterations=10)
+        self.team_colors = centers[0]
+
+    def _classify(self, store, rows, colors):
+        distances = np.sqrt(((colors[:, None, :] - self.team_colors[None]) ** 2).sum(axis=-1))
+        teams = distances.argmin(axis=1)
+        near, far = distances.min(axis=1), distances.max(axis=1)
+        confidence = (far - near) / np.maximum(far + near, 1e-6)
+        for row, team, conf in zip(rows.tolist(), teams.tolist(), confidence.tolist()):
+            track_id = int(store.track_id[row])
+            cached = self._tracks.get(track_id)
+            frame_idx = int(store.frame[row])
+            # Une évaluation moins sûre ne remplace une précédente que si celle-ci est périmée
+            if cached is None or conf >= cached[1] or frame_idx - cached[2] >= self.interval:
+                self._tracks[track_id] = (team, conf, frame_idx)
+
+    def _prune(self, frame_idx):
+        horizon = frame_idx - 2 * self.interval
+        self._tracks = {track_id: cached for track_id, cached in self._tracks.items() if cached[2] >= horizon}
+
+    def colors(self, kinds, teams):
+        """
+        Couleur de dessin par ligne : couleur de l'équipe pour les joueurs classés, couleurs par défaut sinon.
+        """
+        colors = np.where((kinds == REFEREE)[:, None], REFEREE_COLOR,
+                          np.where((kinds == BALL)[:, None], BALL_COLOR, DEFAULT_PLAYER_COLOR)).astype(np.int32)
+        assigned = teams >= 0
+        if assigned.any():
+            colors[assigned] = np.rint(self.team_colors[teams[assigned]]).astype(np.int32)
+        return colors
+
+    def team_color(self, team):
+        return tuple(int(c) for c in np.rint(self.team_colors[team]))
+
+    def stats(self):
+        return {
+            "team_colors": [list(self.team_color(team)) for team in (0, 1)] if self.team_colors is not None else None,
+            "tracks": len(self._tracks),
+            "evaluations": self.evaluations,
+        }
@@ -0,0 +1,20 @@
+# Pool de buffers du décodage
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from decoder import FramePool  # noqa: E402
+
+
+def test_release_replaces_foreign_buffer():
+    # Frame allouée par le backend (autre forme) : le pool ne doit pas perdre de buffer
+    pool = FramePool(2, (4, 6, 3))
+    pool.acquire()
+    pool.acquire()
+    pool.release(np.zeros((8, 12, 3), dtype=np.uint8))
+    assert pool.in_use == 1
+    buffer = pool.acquire()
+    assert buffer.shape == (4, 6, 3) and buffer.dtype == np.uint8
@@ -0,0 +1,44 @@
+# Overlay client : mêmes ellipses que le rendu serveur
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import renderer  # noqa: E402
+from track_feed import ABSOLUTE, DELTA, FRAME_HEADER, encode_batch  # noqa: E402
+from track_store import PLAYER, TrackStore  # noqa: E402
+
+INDEX_HTML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates", "index.html")
+
+
+def test_ellipse_arc_matches_renderer():
+    with open(INDEX_HTML, encoding="utf-8") as f:
+        html = f.read()
+    angles = re.search(r"const ELLIPSE_START_ANGLE = (-?\d+), ELLIPSE_END_ANGLE = (-?\d+);", html)
+    assert angles is not None
+    assert (int(angles.group(1)), int(angles.group(2))) == (renderer.ELLIPSE_START_ANGLE, renderer.ELLIPSE_END_ANGLE)
+    # cv2.ellipse parcourt l'arc dans le sens horaire à l'écran, comme le canvas sans anticlockwise
+    call = re.search(r"ctx\.ellipse\(([^;]*)\);", html)
+    assert call is not None
+    args = [arg.strip() for arg in call.group(1).split(",")]
+    assert args[5:] == ["ELLIPSE_START_ANGLE * Math.PI / 180", "ELLIPSE_END_ANGLE * Math.PI / 180", "false"]
+
+
+def test_track_feed_keeps_large_track_ids():
+    # Ids au-delà de 65535 (long match, reprise décalée par track_id_offset) : pas de repli
+    store = TrackStore()
+    for frame in range(3):
+        store.append(frame, PLAYER, [70000, 4464], [[10 + frame, 20, 50, 90], [100, 20, 140, 90]])
+    data = encode_batch(store, 0, 3)
+    offset, ids = 0, []
+    while offset < len(data):
+        _, n_absolute, n_delta = FRAME_HEADER.unpack_from(data, offset)
+        offset += FRAME_HEADER.size
+        absolute = np.frombuffer(data, ABSOLUTE, n_absolute, offset)
+        offset += absolute.nbytes
+        delta = np.frombuffer(data, DELTA, n_delta, offset)
+        offset += delta.nbytes
+        ids.append(sorted(absolute["track_id"].tolist() + delta["track_id"].tolist()))
+    assert ids == [[4464, 70000]] * 3
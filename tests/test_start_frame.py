@@ -0,0 +1,50 @@
+# Analyse démarrée au milieu d'une vidéo, sans cache de détections
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip("ultralytics")
+
+from benchmarks.synthetic import generate_clip, StubDetector  # noqa: E402
+
+START_FRAME = 20
+N_FRAMES = 60
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Dossiers uploads/outputs/cache créés à l'import de app
+    monkeypatch.setenv("WARMUP_MODEL", "0")
+    import app
+    monkeypatch.setattr(app, "inference_pool", StubDetector())
+    monkeypatch.setattr(app.Config, "USE_DETECTION_CACHE", False)
+    monkeypatch.setattr(app.Config, "TEAM_ASSIGNMENT", True)
+    monkeypatch.setattr(app.Config, "OUTPUT_FOLDER", str(tmp_path / "outputs"))
+    return app
+
+
+def test_start_frame_without_cache(app_module, tmp_path):
+    clip = generate_clip(str(tmp_path / "clip.mp4"), width=640, height=360, n_frames=N_FRAMES)
+    processor = app_module.VideoProcessor(job_id="test", start_frame=START_FRAME)
+    batches = []
+    get_tracks = processor._get_tracks
+
+    def record(batch_start, batch):
+        store = get_tracks(batch_start, batch)
+        batches.append((batch_start, len(batch), store.frame.copy()))
+        return store
+
+    processor._get_tracks = record
+    assert processor.set_video(clip)
+    assert processor.join(timeout=60)
+    processor.exporter.close()
+
+    assert processor.is_completed
+    assert processor.processed_frames == N_FRAMES - START_FRAME
+    assert batches[0][0] == START_FRAME
+    for batch_start, n_frames, frames in batches:
+        # Lignes numérotées comme les frames du lot : toutes dessinées
+        assert len(frames)
+        assert frames.min() >= batch_start and frames.max() < batch_start + n_frames
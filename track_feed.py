@@ -0,0 +1,135 @@
+# Flux compact des suivis, pour dessiner les annotations dans le navigateur (mode overlay client)
+import base64
+import struct
+import threading
+from collections import deque
+import numpy as np
+from track_store import FLAG_INTERPOLATED, FLAG_PROPAGATED
+
+# En-tête d'une frame : index de frame, nombre d'objets en absolu, nombre d'objets en delta
+FRAME_HEADER = struct.Struct("<IHH")
+# Objet : track_id (uint32 : les ids ByteTrack croissent tout le match, décalés en cas de reprise), attributs, boîte (pixels entiers)
+#   attributs : bits 0-1 type (track_store.KINDS), bits 2-3 équipe + 1 (0 : inconnue),
+#               bit 4 porteur du ballon, bit 5 position estimée (interpolée ou propagée)
+ABSOLUTE = np.dtype([("track_id", "<u4"), ("attrs", "u1"), ("box", "<i2", 4)])  # 13 octets
+DELTA = np.dtype([("track_id", "<u4"), ("attrs", "u1"), ("box", "i1", 4)])  # 9 octets : écart à la frame précédente
+ATTR_HAS_BALL = 1 << 4
+ATTR_ESTIMATED = 1 << 5
+
+
+def encode_batch(store, frame_start, n_frames, teams=None, has_ball=None):
+    """
+    Encode les frames [frame_start, frame_start + n_frames) du store. Une boîte est codée en écart
+    (int8) à celle de la même track à la frame précédente quand il tient sur un octet, en absolu
+    (int16) sinon ; la première frame est toujours absolue : chaque lot se décode seul.
+    """
+    rows = store.frame_rows(frame_start, frame_start + n_frames)
+    bounds = np.searchsorted(store.frame[rows], np.arange(frame_start, frame_start + n_frames + 1))
+    kinds = store.kind.astype(np.uint8)
+    attrs = kinds.copy()
+    if teams is not None:
+        attrs |= ((teams.astype(np.int16) + 1).astype(np.uint8) & 3) << 2
+    if has_ball is not None:
+        attrs |= np.where(has_ball, ATTR_HAS_BALL, 0).astype(np.uint8)
+    attrs |= np.where(store.flags & (FLAG_INTERPOLATED | FLAG_PROPAGATED), ATTR_ESTIMATED, 0).astype(np.uint8)
+    # Clé de correspondance d'une frame à l'autre : le ballon (id 1) ne doit pas se confondre avec la track 1
+    keys = store.track_id.astype(np.int64) * 4 + kinds
+    boxes = np.rint(store.bbox).astype(np.int32)
+
+    parts = []
+    previous_keys = np.empty(0, np.int64)
+    previous_boxes = np.empty((0, 4), np.int32)
+    for frame_num in range(n_frames):
+        frame_rows = rows[bounds[frame_num]:bounds[frame_num + 1]]
+        frame_rows = frame_rows[np.argsort(keys[frame_rows], kind="stable")]
+        frame_keys, frame_boxes = keys[frame_rows], boxes[frame_rows]
+
+        # Track présente à la frame précédente et écart sur un octet : codage delta
+        delta = np.zeros(len(frame_rows), dtype=bool)
+        if len(previous_keys) and len(frame_rows):
+            index = np.minimum(np.searchsorted(previous_keys, frame_keys), len(previous_keys) - 1)
+            offsets = frame_boxes - previous_boxes[index]
+            delta = (previous_keys[index] == frame_keys) & (np.abs(offsets) <= 127).all(axis=1)
+
+        absolute_records = np.empty(int((~delta).sum()), dtype=ABSOLUTE)
+        absolute_records["track_id"] = store.track_id[frame_rows[~delta]]
+        absolute_records["attrs"] = attrs[frame_rows[~delta]]
+        absolute_records["box"] = frame_boxes[~delta]
+        delta_records = np.empty(int(delta.sum()), dtype=DELTA)
+        if len(delta_records):
+            delta_records["track_id"] = store.track_id[frame_rows[delta]]
+            delta_records["attrs"] = attrs[frame_rows[delta]]
+            delta_records["box"] = offsets[delta]
+
+        parts.append(FRAME_HEADER.pack(frame_start + frame_num, len(absolute_records), len(delta_records)))
+        parts.append(absolute_records.tobytes())
+        parts.append(delta_records.tobytes())
+        previous_keys, previous_boxes = frame_keys, frame_boxes
+    return b"".join(parts)
+
+
+class TrackFeed:
+    """
+    Lots de suivis encodés d'un job (8 octets par frame plus 9 à 13 octets par objet), diffusés en
+    direct ; les plus récents, dans la limite de max_bytes, sont conservés pour qu'un spectateur
+    arrivé en cours de traitement reçoive l'historique. Au-delà, les plus anciens sont oubliés.
+    L'encodage est fait une fois par lot, quel que soit le nombre de spectateurs.
+    """
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.meta = {}  # Dimensions des frames, fps... (envoyées à la connexion)
+        self.max_bytes = max_bytes
+        self._chunks = deque()  # Données encodées en base64
+        self._first = 0  # Numéro du plus ancien lot conservé
+        self._stored_bytes = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.bytes = 0
+        self.frames = 0
+
+    def publish(self, store, frame_start, n_frames, teams=None, has_ball=None):
+        data = base64.b64encode(encode_batch(store, frame_start, n_frames, teams, has_ball)).decode("ascii")
+        with self._cond:
+            self._chunks.append(data)
+            self._stored_bytes += len(data)
+            while self._stored_bytes > self.max_bytes and len(self._chunks) > 1:
+                self._stored_bytes -= len(self._chunks.popleft())
+                self._first += 1
+            self.bytes += len(data) * 3 // 4
+            self.frames += n_frames
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def wait_for(self, index, timeout=None):
+        """
+        (lots publiés à partir du numéro index, numéro du lot suivant) : liste éventuellement vide
+        après timeout, et commençant au plus ancien lot conservé si index a été oublié.
+        None une fois le flux terminé et entièrement lu.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._first + len(self._chunks) > index or self._closed, timeout)
+            end = self._first + len(self._chunks)
+            if index >= end and self._closed:
+                return None
+            start = max(index, self._first)
+            return [self._chunks[i - self._first] for i in range(start, end)], end
+
+    def stats(self):
+        with self._cond:
+            return {
+                "chunks": self._first + len(self._chunks),
+                "chunks_stored": len(self._chunks),
+                "stored_bytes": self._stored_bytes,
+                "frames": self.frames,
+                "bytes": self.bytes,
+                "bytes_per_frame": round(self.bytes / self.frames, 1) if self.frames else None,
+                "closed": self._closed,
+            }
@@ -0,0 +1,218 @@
+# Stockage colonnes des suivis (structure de tableaux)
+import numpy as np
+
+KINDS = ("players", "referees", "ball")
+PLAYER, REFEREE, BALL = 0, 1, 2
+CLASS_NAMES = {PLAYER: "player", REFEREE: "referee"}
+
+# Drapeaux par ligne
+FLAG_INTERPOLATED = 1  # Position du ballon interpolée
+FLAG_PROPAGATED = 2  # Boîte prédite entre deux frames clés
+
+# Format ligne (float32) utilisé pour la sérialisation :
+# frame_idx, type d'objet, track_id, x1, y1, x2, y2, drapeaux
+ROW_WIDTH = 8
+
+
+def compute_positions(kinds, bboxes):
+    """
+    Positions de toutes les boîtes en une passe : centre pour le ballon, pieds sinon.
+    """
+    positions = np.empty((len(bboxes), 2), dtype=np.float32)
+    positions[:, 0] = (bboxes[:, 0] + bboxes[:, 2]) / 2
+    positions[:, 1] = np.where(kinds == BALL, (bboxes[:, 1] + bboxes[:, 3]) / 2, bboxes[:, 3])
+    return positions
+
+
+class TrackStore:
+    """
+    Suivis stockés en colonnes : frame, track_id, type, bbox (float32), position, drapeaux.
+    Les ajouts sont amortis (capacité doublée) ; les index par frame et par track
+    sont construits à la demande et invalidés au prochain ajout.
+    """
+
+    def __init__(self, capacity=64):
+        self._size = 0
+        self._frame = np.empty(capacity, dtype=np.int32)
+        self._track_id = np.empty(capacity, dtype=np.int32)
+        self._kind = np.empty(capacity, dtype=np.int8)
+        self._bbox = np.empty((capacity, 4), dtype=np.float32)
+        self._position = np.empty((capacity, 2), dtype=np.float32)
+        self._flags = np.empty(capacity, dtype=np.uint8)
+        self._frame_order = None
+        self._track_order = None
+
+    def __len__(self):
+        return self._size
+
+    # Colonnes (vues sur la partie utilisée)
+    @property
+    def frame(self):
+        return self._frame[:self._size]
+
+    @property
+    def track_id(self):
+        return self._track_id[:self._size]
+
+    @property
+    def kind(self):
+        return self._kind[:self._size]
+
+    @property
+    def bbox(self):
+        return self._bbox[:self._size]
+
+    @property
+    def position(self):
+        return self._position[:self._size]
+
+    @property
+    def flags(self):
+        return self._flags[:self._size]
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in (self._frame, self._track_id, self._kind,
+                                                self._bbox, self._position, self._flags))
+
+    def _reserve(self, n):
+        needed = self._size + n
+        capacity = len(self._frame)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_frame", "_track_id", "_kind", "_bbox", "_position", "_flags"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def append(self, frame_idx, kind, track_ids, bboxes, flags=0):
+        """
+        Ajoute un groupe de lignes ; frame_idx, kind et flags peuvent être scalaires ou par ligne.
+        """
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        n = len(bboxes)
+        if n == 0:
+            return
+        self._reserve(n)
+        rows = slice(self._size, self._size + n)
+        self._frame[rows] = frame_idx
+        self._track_id[rows] = track_ids
+        self._kind[rows] = kind
+        self._bbox[rows] = bboxes
+        self._position[rows] = compute_positions(self._kind[rows], bboxes)
+        self._flags[rows] = flags
+        self._size += n
+        self._frame_order = None
+        self._track_order = None
+
+    def extend(self, other):
+        if len(other):
+            self.append(other.frame, other.kind, other.track_id, other.bbox, other.flags)
+
+    def select(self, rows):
+        """
+        Nouveau store contenant les lignes indiquées (masque booléen ou indices).
+        """
+        store = TrackStore(capacity=max(1, len(self.frame[rows])))
+        store.append(self.frame[rows], self.kind[rows], self.track_id[rows], self.bbox[rows], self.flags[rows])
+        return store
+
+    def drop_before(self, frame_idx):
+        """
+        Supprime les lignes des frames antérieures à frame_idx (fenêtre glissante).
+        """
+        keep = self.frame >= frame_idx
+        if keep.all():
+            return
+        n = int(keep.sum())
+        for name in ("_frame", "_track_id", "_kind", "_bbox", "_position", "_flags"):
+            column = getattr(self, name)
+            column[:n] = column[:self._size][keep]
+        self._size = n
+        self._frame_order = None
+        self._track_order = None
+
+    # Index
+    def _sorted_by_frame(self):
+        if self._frame_order is None:
+            self._frame_order = np.argsort(self.frame, kind='stable')
+        return self._frame_order
+
+    def frame_rows(self, frame_start, frame_end=None):
+        """
+        Indices des lignes des frames [frame_start, frame_end), dans l'ordre des frames.
+        """
+        if frame_end is None:
+            frame_end = frame_start + 1
+        order = self._sorted_by_frame()
+        frames = self.frame[order]
+        lo = np.searchsorted(frames, frame_start, side='left')
+        hi = np.searchsorted(frames, frame_end, side='left')
+        return order[lo:hi]
+
+    def track_rows(self, track_id, kind=None):
+        """
+        Indices des lignes d'une track, dans l'ordre des frames.
+        """
+        if self._track_order is None:
+            self._track_order = np.lexsort((self.frame, self.track_id))
+        order = self._track_order
+        ids = self.track_id[order]
+        rows = order[np.searchsorted(ids, track_id, side='left'):np.searchsorted(ids, track_id, side='right')]
+        if kind is not None:
+            rows = rows[self.kind[rows] == kind]
+        return rows
+
+    # Conversions
+    def to_dict(self, frame_start, frame_end):
+        """
+        Export au format historique : {"players": [ {track_id: {"bbox": [...], ...}} par frame ], ...}.
+        """
+        tracks = {object: [{} for _ in range(frame_end - frame_start)] for object in KINDS}
+        rows = self.frame_rows(frame_start, frame_end)
+        positions = self.position[rows].astype(np.int64).tolist()
+        for row, position in zip(rows.tolist(), positions):
+            kind = int(self._kind[row])
+            track_info = {"bbox": self._bbox[row].tolist(), "position": tuple(position)}
+            if kind in CLASS_NAMES:
+                track_info["class_name"] = CLASS_NAMES[kind]
+            flags = int(self._flags[row])
+            if flags & FLAG_INTERPOLATED:
+                track_info["interpolated"] = True
+            if flags & FLAG_PROPAGATED:
+                track_info["propagated"] = True
+            tracks[KINDS[kind]][int(self._frame[row]) - frame_start][int(self._track_id[row])] = track_info
+        return tracks
+
+    @classmethod
+    def from_dict(cls, tracks, frame_start=0):
+        store = cls()
+        for kind, object in enumerate(KINDS):
+            for frame_num, frame_tracks in enumerate(tracks.get(object, [])):
+                if not frame_tracks:
+                    continue
+                flags = [(FLAG_INTERPOLATED if info.get("interpolated") else 0) |
+                         (FLAG_PROPAGATED if info.get("propagated") else 0) for info in frame_tracks.values()]
+                store.append(frame_start + frame_num, kind, list(frame_tracks.keys()),
+                             [info["bbox"] for info in frame_tracks.values()], flags)
+        return store
+
+    def to_rows(self):
+        rows = np.empty((self._size, ROW_WIDTH), dtype=np.float32)
+        rows[:, 0] = self.frame
+        rows[:, 1] = self.kind
+        rows[:, 2] = self.track_id
+        rows[:, 3:7] = self.bbox
+        rows[:, 7] = self.flags
+        return rows[self._sorted_by_frame()]
+
+    @classmethod
+    def from_rows(cls, rows):
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, ROW_WIDTH)
+        store = cls(capacity=max(1, len(rows)))
+        store.append(rows[:, 0].astype(np.int32), rows[:, 1].astype(np.int8), rows[:, 2].astype(np.int32),
+                     rows[:, 3:7], rows[:, 7].astype(np.uint8))
+        return store
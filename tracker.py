@@ -1,5 +1,4 @@
 # Importation des bibliothèques nécessaires
-from ultralytics import YOLO  # Pour le modèle de détection YOLOv8
 import supervision as sv  # Librairie de suivi (tracking)
 import pickle  # Pour la sauvegarde/chargement des objets Python
 import os
@@ -7,18 +6,93 @@ import numpy as np
 import pandas as pd
 import cv2  # OpenCV pour le traitement d’image
 import sys
+from collections import deque
 
 # Ajout du chemin du dossier parent pour accéder aux fonctions utilitaires
 sys.path.append('../')
 from utils import get_center_of_bbox, get_bbox_width, get_foot_position  # Fonctions utilitaires personnalisées
+from model_registry import get_model  # Modèles YOLO partagés entre les trackers
+from inference_pool import to_supervision  # Résultats d'inférence -> détections supervision
+from renderer import AnnotationRenderer, ELLIPSE_START_ANGLE, ELLIPSE_END_ANGLE  # Rendu vectorisé des annotations
+from pipeline import LatencyTracker  # Temps par étape
+from track_store import TrackStore, PLAYER, REFEREE, BALL, FLAG_INTERPOLATED, FLAG_PROPAGATED  # Suivis en colonnes
 
 # Classe principale pour la détection et le suivi des objets
 class Tracker:
-    def __init__(self, model_path):
-        # Chargement du modèle YOLO
-        self.model = YOLO(model_path)
+    def __init__(self, model_path=None, model=None, conf=0.1, imgsz=640,
+                 history_size=30, ball_window=50, max_ball_gap=25,
+                 detect_stride=1, motion_threshold=None, overlay_scale=1.0, ball_search=None, batch_size=20,
+                 latency=None, team_assigner=None, possession=None):
+        # Modèle YOLO partagé (chargé une seule fois par processus)
+        self.model = model if model is not None else get_model(model_path)
+        # Paramètres d'inférence (font partie de la clé du cache de détections)
+        self.conf = conf
+        self.imgsz = imgsz
+        self.batch_size = batch_size  # Frames par appel au modèle
+        # Temps passé dans l'inférence, ByteTrack et la recherche du ballon
+        self.latency = latency if latency is not None else LatencyTracker()
+        # Seconde passe optionnelle pour le ballon (BallSearch : recadrage / tuiles)
+        self.ball_search = ball_search
+        # Équipes d'après la couleur des maillots (TeamAssigner), mises en cache par track
+        self.team_assigner = team_assigner
+        # Possession du ballon (PossessionTracker), cumulée au fil des lots
+        self.possession = possession
         # Initialisation du tracker ByteTrack
         self.tracker = sv.ByteTrack()
+        # Ajouté aux identifiants ByteTrack (qui repartent de 1) quand une analyse reprend après un cache
+        self.track_id_offset = 0
+        # Rendu des annotations
+        self.renderer = AnnotationRenderer(overlay_scale=overlay_scale)
+
+        # État conservé entre les appels à update()
+        self.history_size = history_size
+        self.max_ball_gap = max_ball_gap  # Nombre max de frames interpolées sans ballon détecté
+        self.frame_count = 0
+        self.history = TrackStore()  # Joueurs/arbitres des history_size dernières frames
+        self.ball_buffer = deque(maxlen=ball_window)  # Positions récentes du ballon : (frame_idx, bbox)
+
+        # Saut de frames : détection toutes les detect_stride frames au plus,
+        # ou plus tôt si le mouvement depuis la dernière détection dépasse motion_threshold
+        self.detect_stride = max(1, int(detect_stride))
+        self.motion_threshold = motion_threshold
+        self._since_keyframe = None
+        self._key_gray = None
+        self._motion_state = {}  # track_id -> (type, frame_idx, bbox, vitesse par frame)
+        self._last_keyframe_idx = None
+
+    @property
+    def skips_frames(self):
+        return self.detect_stride > 1 or self.motion_threshold is not None
+
+    def cache_settings(self):
+        """
+        Réglages du suivi qui modifient les résultats (clé du cache de détections ; None = valeur par défaut).
+        """
+        return {
+            "detect_stride": self.detect_stride if self.skips_frames else None,
+            "motion_threshold": self.motion_threshold,
+            "ball_search": self.ball_search.key if self.ball_search is not None else None,
+        }
+
+    def reset(self):
+        """
+        Réinitialise l'état incrémental (nouvelle vidéo).
+        """
+        self.tracker = sv.ByteTrack()
+        self.track_id_offset = 0
+        self.frame_count = 0
+        self.history = TrackStore()
+        self.ball_buffer.clear()
+        self._since_keyframe = None
+        self._key_gray = None
+        self._motion_state.clear()
+        self._last_keyframe_idx = None
+        if self.ball_search is not None:
+            self.ball_search.reset()
+        if self.team_assigner is not None:
+            self.team_assigner.reset()
+        if self.possession is not None:
+            self.possession.reset()
 
     def add_position_to_tracks(self, tracks):
         """
@@ -54,13 +128,178 @@ class Tracker:
         """
         Effectue la détection d'objets sur une liste d'images par batch.
         """
-        batch_size = 20
         detections = []
-        for i in range(0, len(frames), batch_size):
-            detections_batch = self.model.predict(frames[i:i + batch_size], conf=0.1)
+        for i in range(0, len(frames), self.batch_size):
+            with self.latency.measure("detect"):
+                detections_batch = self.model.predict(frames[i:i + self.batch_size], conf=self.conf,
+                                                      imgsz=self.imgsz)
             detections += detections_batch
         return detections
 
+    def update(self, frames):
+        """
+        Suivi incrémental : traite un lot de frames consécutives en conservant l'état
+        (ByteTrack, historique par track, positions récentes du ballon) d'un appel à l'autre.
+        Les trous de détection du ballon sont comblés sur une fenêtre glissante.
+        Retourne le dictionnaire de suivi historique (voir update_store pour le format colonnes).
+        """
+        frame_start = self.frame_count
+        store = self.update_store(frames)
+        tracks = store.to_dict(frame_start, frame_start + len(frames))
+        teams, _, has_ball = self.annotate_rows(frames, store, frame_start)
+        # Champs lus par draw_annotations
+        player_rows = np.flatnonzero(store.kind == PLAYER).tolist()
+        for row in player_rows:
+            track_info = tracks["players"][int(store.frame[row]) - frame_start][int(store.track_id[row])]
+            if teams is not None and teams[row] >= 0:
+                track_info["team"] = int(teams[row])
+                track_info["team_color"] = self.team_assigner.team_color(teams[row])
+            if has_ball is not None and has_ball[row]:
+                track_info["has_ball"] = True
+        return tracks
+
+    def update_store(self, frames):
+        """
+        Comme update(), mais retourne un TrackStore (colonnes) pour les frames du lot.
+        """
+        frame_start = self.frame_count
+        if self.skips_frames:
+            store = self._update_with_stride(frames)
+        else:
+            store = self._store_from_detections(self.detect_frames(frames),
+                                                range(frame_start, frame_start + len(frames)), frames)
+        self._fill_ball_gaps(store, frame_start, len(frames))
+        self._update_history(store, len(frames))
+        self.frame_count += len(frames)
+        return store
+
+    def annotate_rows(self, frames, store, frame_start):
+        """
+        Équipe, couleur de dessin et possession du ballon de chaque ligne du store :
+        (teams, colors, has_ball), None pour une étape désactivée.
+        À appeler avant le dessin : les maillots sont lus dans les frames.
+        """
+        teams = colors = has_ball = None
+        if self.team_assigner is not None:
+            with self.latency.measure("teams"):
+                teams = self.team_assigner.assign(frames, store, frame_start)
+                colors = self.team_assigner.colors(store.kind, teams)
+        if self.possession is not None:
+            with self.latency.measure("possession"):
+                has_ball = self.possession.update(store, frame_start, len(frames), teams)
+        return teams, colors, has_ball
+
+    def get_track_history(self, track_id):
+        """
+        Positions récentes d'un joueur/arbitre : liste de (frame_idx, position).
+        """
+        rows = self.history.track_rows(track_id)
+        return list(zip(self.history.frame[rows].tolist(),
+                        map(tuple, self.history.position[rows].astype(np.int64).tolist())))
+
+    def _update_history(self, store, n_frames):
+        # Fenêtre glissante des history_size dernières frames (joueurs et arbitres)
+        self.history.extend(store.select(store.kind != BALL))
+        self.history.drop_before(self.frame_count + n_frames - self.history_size)
+
+    def _update_with_stride(self, frames):
+        """
+        Détection sur les frames clés uniquement ; entre deux, les joueurs et arbitres
+        sont propagés à vitesse constante depuis leur dernière position suivie.
+        Le ballon n'est pas propagé : ses trous sont comblés par _fill_ball_gaps.
+        """
+        keyframes = self._select_keyframes(frames)
+        key_frames = [frames[i] for i in keyframes]
+        store = self._store_from_detections(self.detect_frames(key_frames),
+                                            [self.frame_count + i for i in keyframes], key_frames)
+
+        key_num = 0
+        for frame_num in range(len(frames)):
+            frame_idx = self.frame_count + frame_num
+            if key_num < len(keyframes) and keyframes[key_num] == frame_num:
+                self._update_motion_state(store, frame_idx)
+                key_num += 1
+            else:
+                self._propagate(store, frame_idx)
+        return store
+
+    def _select_keyframes(self, frames):
+        keyframes = []
+        for frame_num, frame in enumerate(frames):
+            is_key = self._since_keyframe is None or self._since_keyframe + 1 >= self.detect_stride
+            gray = None
+            if self.motion_threshold is not None:
+                gray = cv2.cvtColor(cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+                if not is_key:
+                    # Différence moyenne (0-255) avec la dernière frame clé : mouvement ou changement de plan
+                    is_key = float(cv2.absdiff(gray, self._key_gray).mean()) > self.motion_threshold
+            if is_key:
+                keyframes.append(frame_num)
+                self._since_keyframe = 0
+                self._key_gray = gray
+            else:
+                self._since_keyframe += 1
+        return keyframes
+
+    def _update_motion_state(self, store, frame_idx):
+        self._last_keyframe_idx = frame_idx
+        rows = store.frame_rows(frame_idx)
+        rows = rows[store.kind[rows] != BALL]
+        for track_id, kind, bbox in zip(store.track_id[rows].tolist(), store.kind[rows].tolist(), store.bbox[rows]):
+            previous = self._motion_state.get(track_id)
+            if previous is not None and previous[1] < frame_idx:
+                velocity = (bbox - previous[2]) / (frame_idx - previous[1])
+            else:
+                velocity = np.zeros(4, dtype=np.float32)
+            self._motion_state[track_id] = (kind, frame_idx, bbox.copy(), velocity)
+
+        # Seules les tracks vues à cette frame clé sont propagées ; les plus anciennes sont oubliées
+        for track_id in [t for t, state in self._motion_state.items() if state[1] < frame_idx - self.history_size]:
+            del self._motion_state[track_id]
+
+    def _propagate(self, store, frame_idx):
+        states = [(track_id, state) for track_id, state in self._motion_state.items()
+                  if state[1] == self._last_keyframe_idx]
+        if not states:
+            return
+        track_ids = np.array([track_id for track_id, _ in states])
+        kinds = np.array([state[0] for _, state in states], dtype=np.int8)
+        bboxes = np.stack([state[2] for _, state in states])
+        velocities = np.stack([state[3] for _, state in states])
+        store.append(frame_idx, kinds, track_ids, bboxes + velocities * (frame_idx - self._last_keyframe_idx),
+                     FLAG_PROPAGATED)
+
+    def _fill_ball_gaps(self, store, frame_start, n_frames):
+        """
+        Interpolation linéaire entre la dernière position connue (éventuellement d'un lot
+        précédent) et la détection suivante ; en fin de lot, la dernière position est maintenue.
+        Au-delà de max_ball_gap frames sans détection, le ballon est considéré perdu.
+        """
+        ball_rows = np.flatnonzero(store.kind == BALL)
+        ball_by_frame = dict(zip(store.frame[ball_rows].tolist(), ball_rows.tolist()))
+        missing = []
+        for frame_idx in range(frame_start, frame_start + n_frames):
+            row = ball_by_frame.get(frame_idx)
+            if row is None:
+                missing.append(frame_idx)
+                continue
+
+            bbox = store.bbox[row].copy()
+            if missing and self.ball_buffer:
+                last_idx, last_bbox = self.ball_buffer[-1]
+                gap = frame_idx - last_idx
+                if gap <= self.max_ball_gap:
+                    t = (np.asarray(missing, dtype=np.float32)[:, None] - last_idx) / gap
+                    store.append(missing, BALL, 1, last_bbox + t * (bbox - last_bbox), FLAG_INTERPOLATED)
+            missing = []
+            self.ball_buffer.append((frame_idx, bbox))
+
+        if missing and self.ball_buffer:
+            last_idx, last_bbox = self.ball_buffer[-1]
+            held = [frame_idx for frame_idx in missing if frame_idx - last_idx <= self.max_ball_gap]
+            if held:
+                store.append(held, BALL, 1, np.repeat(last_bbox[None], len(held), axis=0), FLAG_INTERPOLATED)
+
     def get_object_tracks(self, frames, read_from_stub=False, stub_path=None):
         """
         Effectue le suivi des objets sur une séquence de frames.
@@ -71,62 +310,62 @@ class Tracker:
                 tracks = pickle.load(f)
             return tracks
 
-        detections = self.detect_frames(frames)
+        store = self._store_from_detections(self.detect_frames(frames), range(len(frames)), frames)
+        tracks = store.to_dict(0, len(frames))
 
-        # Initialisation des dictionnaires de suivi
-        tracks = {
-            "players": [],
-            "referees": [],
-            "ball": []
-        }
+        # Sauvegarde optionnelle des résultats
+        if stub_path is not None:
+            with open(stub_path, 'wb') as f:
+                pickle.dump(tracks, f)
+
+        return tracks
+
+    def _store_from_detections(self, detections, frame_indices, frames=None):
+        """
+        Applique ByteTrack aux détections et range joueurs, arbitres et ballon dans un TrackStore.
+        frames (facultatif) permet la seconde passe de recherche du ballon.
+        """
+        store = TrackStore()
 
         # Parcours de chaque frame
-        for frame_num, detection in enumerate(detections):
+        for i, (frame_idx, detection) in enumerate(zip(frame_indices, detections)):
             cls_names = detection.names  # Mapping id -> nom
             cls_names_inv = {v: k for k, v in cls_names.items()}  # Mapping nom -> id
 
             # Conversion des détections au format de supervision
-            detection_supervision = sv.Detections.from_ultralytics(detection)
+            detection_supervision = to_supervision(detection)
 
             # Remplacement des gardiens par des joueurs dans les classes
-            for object_ind, class_id in enumerate(detection_supervision.class_id):
-                if cls_names[class_id] == "goalkeeper":
-                    detection_supervision.class_id[object_ind] = cls_names_inv["player"]
+            if "goalkeeper" in cls_names_inv:
+                goalkeepers = detection_supervision.class_id == cls_names_inv["goalkeeper"]
+                detection_supervision.class_id[goalkeepers] = cls_names_inv["player"]
 
             # Application du suivi avec ByteTrack
-            detection_with_tracks = self.tracker.update_with_detections(detection_supervision)
-
-            # Initialisation des dictionnaires pour cette frame
-            tracks["players"].append({})
-            tracks["referees"].append({})
-            tracks["ball"].append({})
-
-            # Traitement des objets suivis (joueurs et arbitres)
-            for frame_detection in detection_with_tracks:
-                bbox = frame_detection[0].tolist()
-                cls_id = frame_detection[3]
-                track_id = frame_detection[4]
-
-                if cls_id == cls_names_inv['player']:
-                    tracks["players"][frame_num][track_id] = {"bbox": bbox, "class_name": "player"}
-
-                if cls_id == cls_names_inv['referee']:
-                    tracks["referees"][frame_num][track_id] = {"bbox": bbox, "class_name": "referee"}
-
-            # Traitement spécifique pour le ballon
-            for frame_detection in detection_supervision:
-                bbox = frame_detection[0].tolist()
-                cls_id = frame_detection[3]
-
-                if cls_id == cls_names_inv['ball']:
-                    tracks["ball"][frame_num][1] = {"bbox": bbox}
-
-        # Sauvegarde optionnelle des résultats
-        if stub_path is not None:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(tracks, f)
-
-        return tracks
+            with self.latency.measure("bytetrack"):
+                detection_with_tracks = self.tracker.update_with_detections(detection_supervision)
+
+            # Objets suivis (joueurs et arbitres)
+            for kind, name in ((PLAYER, 'player'), (REFEREE, 'referee')):
+                mask = detection_with_tracks.class_id == cls_names_inv[name]
+                store.append(frame_idx, kind, detection_with_tracks.tracker_id[mask] + self.track_id_offset,
+                             detection_with_tracks.xyxy[mask])
+
+            # Traitement spécifique pour le ballon (non suivi : identifiant 1, dernière détection)
+            balls = np.flatnonzero(detection_supervision.class_id == cls_names_inv['ball'])
+            ball_bbox = None
+            if len(balls):
+                ball_bbox = detection_supervision.xyxy[balls[-1]]
+                if self.ball_search is not None:
+                    self.ball_search.observe(frame_idx, ball_bbox)
+            elif self.ball_search is not None and frames is not None:
+                # Ballon manqué : recadrage autour de la position prédite ou tuiles
+                with self.latency.measure("ball_search"):
+                    ball_bbox = self.ball_search.search(self.model, frames[i], frame_idx,
+                                                        cls_names_inv['ball'], self.conf)
+            if ball_bbox is not None:
+                store.append(frame_idx, BALL, 1, ball_bbox)
+
+        return store
 
     def draw_ellipse(self, frame, bbox, color, track_id=None, class_name=""):
         """
@@ -143,8 +382,8 @@ class Tracker:
             center=(x_center, y2),
             axes=(int(width), int(0.35 * width)),
             angle=0.0,
-            startAngle=-45,
-            endAngle=235,
+            startAngle=ELLIPSE_START_ANGLE,
+            endAngle=ELLIPSE_END_ANGLE,
             color=color,
             thickness=2,
             lineType=cv2.LINE_4
@@ -189,43 +428,13 @@ class Tracker:
 
         return frame
 
-    def draw_annotations(self, video_frames, tracks):
+    def draw_annotations(self, video_frames, tracks, in_place=False):
         """
         Dessine toutes les annotations sur les frames de la vidéo :
         - ellipse pour joueurs et arbitres
         - triangle pour le ballon et joueurs en possession du ballon
+        Avec in_place=True, les frames fournies servent directement de buffer de sortie.
         """
-        output_video_frames = []
-        for frame_num, frame in enumerate(video_frames):
-            frame = frame.copy()
-
-            player_dict = tracks["players"][frame_num]
-            ball_dict = tracks["ball"][frame_num]
-            referee_dict = tracks["referees"][frame_num]
-
-            # Dessin des joueurs
-            for track_id, player in player_dict.items():
-                color = player.get("team_color", (0, 100, 255))  # Couleur d’équipe par défaut
-                frame = self.draw_ellipse(
-                    frame,
-                    player["bbox"],
-                    color,
-                    track_id,
-                    class_name=player.get("class_name", "")
-                )
-
-                # Triangle si le joueur a le ballon
-                if player.get('has_ball', False):
-                    frame = self.draw_traingle(frame, player["bbox"], (0, 0, 255))
-
-            # Dessin des arbitres
-            for _, referee in referee_dict.items():
-                frame = self.draw_ellipse(frame, referee["bbox"], (0, 255, 255))
-
-            # Dessin du ballon
-            for track_id, ball in ball_dict.items():
-                frame = self.draw_traingle(frame, ball["bbox"], (0, 255, 0))
-
-            output_video_frames.append(frame)
-
-        return output_video_frames
\ No newline at end of file
+        if not in_place:
+            video_frames = [frame.copy() for frame in video_frames]
+        return self.renderer.draw_annotations(video_frames, tracks)
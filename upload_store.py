@@ -0,0 +1,192 @@
+# Dossier des vidéos uploadées : index des tailles en mémoire et éviction LRU
+import json
+import os
+import threading
+import time
+
+
+class UploadStore:
+    """
+    Vidéos du dossier d'uploads, indexées en mémoire (taille, dernier accès) : un seul parcours
+    au démarrage, puis mise à jour à chaque ajout ou suppression.
+    Au-delà de max_bytes, les vidéos les moins récemment utilisées sont supprimées une à une,
+    sauf celles en cours d'utilisation (in_use() : chemins des jobs actifs et uploads en cours)
+    et celles épinglées (vidéo ajoutée dont le job n'est pas encore créé, voir unpin()).
+    L'empreinte de chaque vidéo, quand elle est connue, est conservée dans <dossier>/.hashes.json ;
+    on_evict(path, empreinte ou None) est appelé avant la suppression (ex. retrait des analyses en cache).
+    """
+
+    def __init__(self, folder, max_bytes, extensions, in_use=None, on_evict=None):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.extensions = tuple(f".{ext}" for ext in extensions)
+        self.in_use = in_use or (lambda: set())
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        # nom -> {"bytes": int, "last_access": float, "complete": bool, "hash": str ou None, "pinned": bool}
+        self._index = {}
+        self.hashes_path = os.path.join(folder, ".hashes.json")
+        os.makedirs(folder, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.hashes_path) as f:
+                hashes = json.load(f)
+        except (OSError, ValueError):
+            hashes = {}
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and entry.name.lower().endswith(self.extensions):
+                stat = entry.stat()
+                known = hashes.get(entry.name)
+                # Empreinte valable tant que le fichier n'a pas changé
+                video_hash = known["hash"] if known and known.get("bytes") == stat.st_size else None
+                self._index[entry.name] = {"bytes": stat.st_size, "last_access": stat.st_mtime, "complete": True,
+                                           "hash": video_hash, "pinned": False}
+
+    def _save_hashes(self):
+        with self._lock:
+            hashes = {name: {"hash": item["hash"], "bytes": item["bytes"]}
+                      for name, item in self._index.items() if item["complete"] and item["hash"]}
+        tmp_path = self.hashes_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(hashes, f)
+            os.replace(tmp_path, self.hashes_path)
+        except OSError as e:
+            print(f"Erreur lors de l'écriture des empreintes des uploads: {e}")
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            return sum(item["bytes"] for item in self._index.values())
+
+    def add(self, path, video_hash=None, pinned=False):
+        """
+        Vidéo complète sur disque (upload terminé) ; libère de la place si nécessaire.
+        pinned : protégée de l'éviction jusqu'à unpin() (le temps de créer son job).
+        """
+        with self._lock:
+            self._index[os.path.basename(path)] = {"bytes": os.path.getsize(path), "last_access": time.time(),
+                                                   "complete": True, "hash": video_hash, "pinned": pinned}
+        if video_hash:
+            self._save_hashes()
+        self.evict()
+
+    def unpin(self, path):
+        with self._lock:
+            item = self._index.get(os.path.basename(path))
+            if item is not None:
+                item["pinned"] = False
+        self.evict()
+
+    def remember_hash(self, path, video_hash):
+        """
+        Empreinte calculée ailleurs (ex. par le cache de détections au démarrage d'un job).
+        """
+        with self._lock:
+            item = self._index.get(os.path.basename(path))
+            if item is None or not item["complete"] or item["hash"] == video_hash:
+                return
+            item["hash"] = video_hash
+        self._save_hashes()
+
+    def video_hash(self, path):
+        with self._lock:
+            item = self._index.get(os.path.basename(path))
+            return item["hash"] if item is not None else None
+
+    def reserve(self, path, size):
+        """
+        Upload en cours : compté pour sa taille annoncée, absent de la liste jusqu'à add().
+        """
+        with self._lock:
+            self._index[os.path.basename(path)] = {"bytes": size, "last_access": time.time(), "complete": False,
+                                                   "hash": None, "pinned": False}
+        self.evict()
+
+    def touch(self, path):
+        with self._lock:
+            item = self._index.get(os.path.basename(path))
+            if item is not None:
+                item["last_access"] = time.time()
+
+    def discard(self, path):
+        """
+        Fichier supprimé hors du store (upload abandonné).
+        """
+        with self._lock:
+            self._index.pop(os.path.basename(path), None)
+
+    def remove(self, path):
+        """
+        Supprime une vidéo ; refusé (False) si elle est utilisée par un job ou un upload.
+        """
+        if os.path.abspath(path) in self._in_use():
+            return False
+        self._delete(os.path.basename(path))
+        return True
+
+    def videos(self):
+        """
+        Noms des vidéos complètes, les plus récemment utilisées d'abord.
+        """
+        with self._lock:
+            items = [(item["last_access"], name) for name, item in self._index.items() if item["complete"]]
+        return [name for _, name in sorted(items, reverse=True)]
+
+    def contains(self, path):
+        with self._lock:
+            item = self._index.get(os.path.basename(path))
+            return item is not None and item["complete"]
+
+    def _in_use(self):
+        return {os.path.abspath(path) for path in self.in_use()}
+
+    def evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        in_use = self._in_use()  # Hors verrou : interroge les jobs et les uploads
+        while True:
+            with self._lock:
+                total = sum(item["bytes"] for item in self._index.values())
+                if total <= self.max_bytes:
+                    return
+                candidates = [(item["last_access"], name) for name, item in self._index.items()
+                              if item["complete"] and not item["pinned"]
+                              and os.path.abspath(os.path.join(self.folder, name)) not in in_use]
+            if not candidates:
+                print(f"Uploads : {(total - self.max_bytes) / 1024 / 1024:.0f} Mo au-delà de la limite, "
+                      f"vidéos restantes en cours d'utilisation")
+                return
+            _, name = min(candidates)
+            print(f"Uploads : éviction de {name}")
+            self._delete(name)
+
+    def _delete(self, name):
+        path = os.path.join(self.folder, name)
+        with self._lock:
+            item = self._index.get(name)
+            video_hash = item["hash"] if item is not None else None
+        if self.on_evict is not None and os.path.exists(path):
+            try:
+                self.on_evict(path, video_hash)
+            except Exception as e:
+                print(f"Erreur lors du nettoyage associé à {name}: {e}")
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._index.pop(name, None)
+        if video_hash:
+            self._save_hashes()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "videos": sum(1 for item in self._index.values() if item["complete"]),
+                "uploading": sum(1 for item in self._index.values() if not item["complete"]),
+                "bytes": sum(item["bytes"] for item in self._index.values()),
+                "max_bytes": self.max_bytes,
+            }